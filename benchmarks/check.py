@@ -0,0 +1,72 @@
+# SCP-079-TIP - Here's a tip
+# Copyright (C) 2019-2020 SCP-079 <https://scp-079.org>
+#
+# This file is part of SCP-079-TIP.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from argparse import ArgumentParser
+
+from environment import prepare
+from fake import Client
+from fixtures import get_message, load_rules, set_group, texts
+from utils import measure, report
+
+
+def main() -> None:
+    # Benchmark the message check pipeline
+    parser = ArgumentParser(description="Benchmark the message check pipeline")
+    parser.add_argument("-n", "--iterations", type=int, default=1000)
+    parser.add_argument("-r", "--rules", type=int, default=200, help="rules of each word type")
+    parser.add_argument("-k", "--keywords", type=int, default=20, help="keywords of the group")
+    parser.add_argument("-o", "--output", default="")
+    args = parser.parse_args()
+
+    prepare()
+
+    from plugins import glovar
+    from plugins.functions.etc import t2t
+    from plugins.functions.filters import is_ban_text, is_emoji, is_keyword_text, is_regex_text
+    from plugins.handlers.message import check
+
+    load_rules(glovar, args.rules)
+    set_group(glovar, keywords=args.keywords)
+    client = Client()
+    results = []
+
+    for name, text in texts.items():
+        extra = {
+            "text": name,
+            "rules": args.rules
+        }
+        message = get_message(text)
+        cases = [
+            ("t2t", t2t, (text, True, True)),
+            ("is_regex_text", is_regex_text, ("del", text)),
+            ("is_ban_text", is_ban_text, (text, False)),
+            ("is_emoji", is_emoji, ("ad", text)),
+            ("is_keyword_text", is_keyword_text, (message,)),
+            ("check", check, (client, message))
+        ]
+
+        for case, target, target_args in cases:
+            result = measure(case, target, target_args, args.iterations)
+            result.update(extra)
+            results.append(result)
+
+    report(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
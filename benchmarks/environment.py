@@ -0,0 +1,110 @@
+# SCP-079-TIP - Here's a tip
+# Copyright (C) 2019-2020 SCP-079 <https://scp-079.org>
+#
+# This file is part of SCP-079-TIP.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import sys
+from base64 import urlsafe_b64encode
+from os import chdir, makedirs, symlink
+from os.path import abspath, dirname, exists, join
+from tempfile import mkdtemp
+
+# Path variables
+ROOT_PATH = dirname(dirname(abspath(__file__)))
+
+# Config template
+config_text = """[basic]
+bot_token = 123456:BENCHMARK
+prefix = /!
+
+[bots]
+avatar_id = 1
+captcha_id = 2
+clean_id = 3
+index_id = 4
+lang_id = 5
+long_id = 6
+noflood_id = 7
+noporn_id = 8
+nospam_id = 9
+tip_id = 10
+user_id = 11
+warn_id = 12
+
+[channels]
+critical_channel_id = -1001000000001
+debug_channel_id = -1001000000002
+exchange_channel_id = -1001000000003
+hide_channel_id = -1001000000004
+logging_channel_id = -1001000000005
+test_group_id = -1001000000006
+
+[custom]
+default_group_link = https://t.me/SCP_079_DEBUG
+leave_button = Apply
+leave_link = https://scp-079.org/ApplyForUse/
+leave_reason = Benchmark
+project_link = https://scp-079.org/tip/
+project_name = SCP-079-TIP
+
+[emoji]
+emoji_ad_single = 15
+emoji_ad_total = 30
+emoji_many = 15
+emoji_protect = \\U0001F642
+emoji_wb_single = 10
+emoji_wb_total = 15
+
+[encrypt]
+key = {key}
+password = benchmark
+
+[language]
+lang = {lang}
+normalize = True
+
+[mode]
+aio = False
+backup = False
+
+[time]
+date_reset = 1st mon
+time_channel = 3600
+time_keyword = 300
+time_ot = 86400
+time_rm = 86400
+time_welcome = 180
+"""
+
+
+def prepare(lang: str = "cmn-Hans", extra: str = "") -> str:
+    # Prepare a sandbox working directory, should be called before importing plugins
+    path = mkdtemp(prefix="tip-benchmark-")
+
+    makedirs(join(path, "data", "config"))
+    makedirs(join(path, "data", "log"))
+    key = urlsafe_b64encode(b"0" * 32).decode()
+
+    with open(join(path, "data", "config", "config.ini"), "w", encoding="utf-8") as f:
+        f.write(config_text.format(key=key, lang=lang) + extra)
+
+    if not exists(join(path, "languages")):
+        symlink(join(ROOT_PATH, "languages"), join(path, "languages"))
+
+    chdir(path)
+    ROOT_PATH not in sys.path and sys.path.insert(0, ROOT_PATH)
+
+    return path
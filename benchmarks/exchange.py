@@ -0,0 +1,68 @@
+# SCP-079-TIP - Here's a tip
+# Copyright (C) 2019-2020 SCP-079 <https://scp-079.org>
+#
+# This file is part of SCP-079-TIP.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from argparse import ArgumentParser
+from html import unescape
+from re import sub
+from types import SimpleNamespace
+
+from environment import prepare
+from utils import measure, report
+
+
+def main() -> None:
+    # Benchmark the exchange channel's wire formats
+    parser = ArgumentParser(description="Benchmark the exchange channel's wire formats")
+    parser.add_argument("-n", "--iterations", type=int, default=10000)
+    parser.add_argument("-o", "--output", default="")
+    args = parser.parse_args()
+
+    prepare()
+
+    from plugins.functions.channel import format_data
+    from plugins.functions.receive import receive_text_data
+
+    payload = {
+        "sender": "CLEAN",
+        "receivers": ["TIP", "USER", "WARN", "NOSPAM", "LANG"],
+        "action": "update",
+        "action_type": "declare",
+        "data": {
+            "group_id": -10012345678,
+            "message_id": 123456
+        }
+    }
+    results = []
+
+    for compact in [False, True]:
+        name = (lambda x: "compact" if x else "verbose")(compact)
+        text = format_data(**payload, compact=compact)
+
+        # The message text received from Telegram is without HTML tags
+        message = SimpleNamespace(text=unescape(sub(r"</?pre>", "", text)), caption=None)
+
+        result = measure(f"format_data_{name}", format_data, tuple(payload.values()) + (compact,), args.iterations)
+        result["bytes"] = len(message.text.encode("utf-8"))
+        results.append(result)
+        results.append(measure(f"receive_text_data_{name}", receive_text_data, (message,), args.iterations))
+
+    report(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+# SCP-079-TIP - Here's a tip
+# Copyright (C) 2019-2020 SCP-079 <https://scp-079.org>
+#
+# This file is part of SCP-079-TIP.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from collections import Counter
+from itertools import count
+from random import Random
+from threading import Lock
+from time import perf_counter, sleep
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Union
+
+from fixtures import get_chat, get_message, get_user
+
+
+class Client:
+    # A local stand-in of pyrogram.Client, it records the calls and answers them with plausible objects
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, flood_rate: float = 0.0, flood_secs: int = 0,
+                 bio: Callable[[int], str] = None, seed: int = 79):
+        # latency and jitter are in seconds, flood_rate is the chance of a call raising FloodWait
+        self.latency = latency
+        self.jitter = jitter
+        self.flood_rate = flood_rate
+        self.flood_secs = flood_secs
+        self.bio = bio or (lambda _: "")
+
+        self.calls: Counter = Counter()
+        self.floods: Counter = Counter()
+        self.times: Dict[str, float] = {}
+        self.sent: List[Dict[str, Any]] = []
+
+        self.lock = Lock()
+        self.message_ids = count(1000000)
+        self.random = Random(seed)
+
+    def call(self, method: str, result: Any, **kwargs) -> Any:
+        # Record the call, then wait or raise like the server would do
+        from pyrogram.errors import FloodWait
+
+        with self.lock:
+            self.calls[method] += 1
+            flood = self.flood_rate and self.random.random() < self.flood_rate
+            secs = self.latency + self.random.uniform(0, self.jitter)
+
+            if kwargs:
+                self.sent.append(dict(kwargs, method=method))
+
+        if flood:
+            with self.lock:
+                self.floods[method] += 1
+
+            raise FloodWait(self.flood_secs)
+
+        start = perf_counter()
+        secs and sleep(secs)
+
+        with self.lock:
+            self.times[method] = self.times.get(method, 0.0) + perf_counter() - start
+
+        return result
+
+    def get_stats(self) -> Dict[str, Dict[str, Union[float, int]]]:
+        # Get the calls, floods and time spent of each method
+        with self.lock:
+            return {
+                method: {
+                    "calls": self.calls[method],
+                    "floods": self.floods[method],
+                    "secs": self.times.get(method, 0.0)
+                }
+                for method in self.calls
+            }
+
+    def get_member(self, cid: int, uid: int, status: str = "member") -> SimpleNamespace:
+        # Get a ChatMember-like object
+        return SimpleNamespace(
+            chat=get_chat(cid),
+            user=get_user(uid),
+            status=status,
+            can_delete_messages=status != "member",
+            can_invite_users=status != "member",
+            can_pin_messages=status != "member",
+            can_restrict_members=status != "member"
+        )
+
+    def get_sent(self, cid: int, text: str = "", **kwargs) -> SimpleNamespace:
+        # Get a Message-like object sent by the bot
+        return get_message(text, uid=11, gid=cid, message_id=next(self.message_ids), **kwargs)
+
+    # The methods used in plugins/functions/telegram.py
+
+    def answer_callback_query(self, callback_query_id: str, text: str = None, show_alert: bool = None) -> bool:
+        return self.call("answer_callback_query", True)
+
+    def delete_messages(self, chat_id: int, message_ids: List[int], **_) -> bool:
+        return self.call("delete_messages", True, chat_id=chat_id, message_ids=list(message_ids))
+
+    def download_media(self, message: Union[str, Any], file_ref: str = None, file_name: str = "", **_) -> str:
+        return self.call("download_media", file_name)
+
+    def edit_message_text(self, chat_id: int, message_id: int, text: str, **_) -> SimpleNamespace:
+        return self.call("edit_message_text", self.get_sent(chat_id, text, message_id=message_id))
+
+    def export_chat_invite_link(self, chat_id: int) -> str:
+        return self.call("export_chat_invite_link", f"https://t.me/joinchat/{abs(chat_id)}")
+
+    def get_chat(self, chat_id: Union[int, str]) -> SimpleNamespace:
+        chat = get_chat(chat_id)
+        chat.members_count = 1000
+
+        return self.call("get_chat", chat)
+
+    def get_chat_member(self, chat_id: int, user_id: int) -> SimpleNamespace:
+        return self.call("get_chat_member", self.get_member(chat_id, user_id))
+
+    def get_chat_members(self, chat_id: int, filter: str = "all", **_) -> List[SimpleNamespace]:
+        admins = [self.get_member(chat_id, 1, "creator"), self.get_member(chat_id, 11, "administrator")]
+        admins[-1].user.is_self = True
+
+        return self.call("get_chat_members", admins)
+
+    def leave_chat(self, chat_id: int, delete: bool = False) -> bool:
+        return self.call("leave_chat", True, chat_id=chat_id)
+
+    def pin_chat_message(self, chat_id: int, message_id: int, **_) -> bool:
+        return self.call("pin_chat_message", True, chat_id=chat_id, message_id=message_id)
+
+    def resolve_peer(self, peer_id: Union[int, str]) -> SimpleNamespace:
+        return self.call("resolve_peer", SimpleNamespace(user_id=peer_id, access_hash=0))
+
+    def send(self, data: Any) -> SimpleNamespace:
+        # Only GetFullUser is sent directly
+        uid = getattr(getattr(data, "id", None), "user_id", 0)
+
+        return self.call(f"send_{type(data).__name__}", SimpleNamespace(user=get_user(uid), about=self.bio(uid)))
+
+    def send_document(self, chat_id: int, document: str, caption: str = "", **_) -> SimpleNamespace:
+        return self.call("send_document", self.get_sent(chat_id, caption), chat_id=chat_id, document=document)
+
+    def send_message(self, chat_id: int, text: str, **_) -> SimpleNamespace:
+        return self.call("send_message", self.get_sent(chat_id, text), chat_id=chat_id, text=text)
+
+    def send_photo(self, chat_id: int, photo: str, caption: str = "", **_) -> SimpleNamespace:
+        return self.call("send_photo", self.get_sent(chat_id, caption), chat_id=chat_id, photo=photo)
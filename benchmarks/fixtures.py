@@ -0,0 +1,140 @@
+# SCP-079-TIP - Here's a tip
+# Copyright (C) 2019-2020 SCP-079 <https://scp-079.org>
+#
+# This file is part of SCP-079-TIP.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from itertools import count
+from random import Random
+from string import ascii_lowercase
+from types import SimpleNamespace
+from typing import Dict, List
+
+# Fixed ids
+GROUP_ID = -10012345678
+
+# Message id generator
+message_ids = count(1)
+
+# Sample texts
+texts: Dict[str, str] = {
+    "plain": "今天天气不错，大家晚上好。Has anyone tried the new release yet?",
+    "emoji": "🔥🔥🔥 限时优惠 🔥🔥🔥 " * 4 + "💰" * 10,
+    "long": "这是一段很长的文字，用来测试规则在长文本上的表现。 " * 40,
+    "keyword": "请问 如何 加入 频道",
+    "spaced": "加    微    信    领    取    福    利"
+}
+
+
+def get_chat(gid: int = GROUP_ID) -> SimpleNamespace:
+    # Get a Chat-like object
+    return SimpleNamespace(
+        id=gid,
+        type="supergroup",
+        title="Benchmark Group",
+        username=None
+    )
+
+
+def get_message(text: str = texts["plain"], uid: int = 100000, gid: int = GROUP_ID, filename: str = "",
+                date: int = 0, **kwargs) -> SimpleNamespace:
+    # Get a Message-like object with the attributes the handlers read
+    message = SimpleNamespace(
+        message_id=next(message_ids),
+        chat=get_chat(gid),
+        from_user=get_user(uid),
+        date=date,
+        text=text,
+        caption=None,
+        document=filename and SimpleNamespace(file_name=filename, file_id="", file_ref=""),
+        audio=None,
+        forward_from=None,
+        forward_from_chat=None,
+        forward_sender_name=None,
+        reply_to_message=None,
+        new_chat_members=None,
+        service=False
+    )
+
+    for key, value in kwargs.items():
+        setattr(message, key, value)
+
+    return message
+
+
+def get_rules(size: int, seed: int = 79) -> Dict[str, int]:
+    # Generate a regex word table, most rules are literal words, some use the common patterns
+    random = Random(seed)
+    patterns = [
+        "{a}",
+        "{a}.{{0,5}}{b}",
+        "{a}\\s*{b}",
+        "(?:{a}|{b})[0-9]{{3,}}",
+        "^{a}",
+        "{a}(?!{b})"
+    ]
+    result = {}
+
+    while len(result) < size:
+        a = "".join(random.choice(ascii_lowercase) for _ in range(random.randint(4, 8)))
+        b = "".join(random.choice(ascii_lowercase) for _ in range(random.randint(4, 8)))
+        result[random.choice(patterns).format(a=a, b=b)] = 0
+
+    return result
+
+
+def get_stream(size: int, users: int = 1000, seed: int = 79) -> List[SimpleNamespace]:
+    # Get a list of messages from different users with mixed texts
+    random = Random(seed)
+    samples = list(texts.values())
+
+    return [get_message(random.choice(samples), 100000 + random.randrange(users)) for _ in range(size)]
+
+
+def get_user(uid: int = 100000, first_name: str = "Benchmark", last_name: str = "User") -> SimpleNamespace:
+    # Get a User-like object
+    return SimpleNamespace(
+        id=uid,
+        first_name=first_name,
+        last_name=last_name,
+        username=None,
+        is_bot=False,
+        is_deleted=False,
+        is_self=False
+    )
+
+
+def load_rules(glovar, size: int) -> None:
+    # Fill every regex word table with generated rules
+    for word_type in glovar.regex:
+        if word_type in {"spc", "spe"}:
+            continue
+
+        setattr(glovar, f"{word_type}_words", get_rules(size, seed=sum(map(ord, word_type))))
+
+
+def set_group(glovar, gid: int = GROUP_ID, keywords: int = 20, welcome: bool = False) -> None:
+    # Init a group with keyword and rm configs
+    from plugins.functions.ids import init_group_id
+
+    keyword_list = [f"关键词{i} || keyword{i}\n+++\n回复 {i}" for i in range(keywords)]
+    keyword_list.append("如何 加入\n+++\n请看置顶")
+
+    init_group_id(gid)
+    glovar.admin_ids[gid] = {1}
+    glovar.trust_ids[gid] = {1}
+    glovar.configs[gid]["keyword_text"] = "\n+++\n".join(keyword_list)
+    glovar.configs[gid]["rm"] = True
+    glovar.configs[gid]["welcome"] = welcome
@@ -0,0 +1,193 @@
+# SCP-079-TIP - Here's a tip
+# Copyright (C) 2019-2020 SCP-079 <https://scp-079.org>
+#
+# This file is part of SCP-079-TIP.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from html import unescape
+from random import Random
+from re import sub
+from threading import Event, Lock, Thread, active_count
+from time import perf_counter, sleep
+from typing import Callable, Dict, List, Tuple, Union
+
+from environment import prepare
+from fake import Client
+from fixtures import GROUP_ID, get_message, get_stream, get_user, load_rules, set_group
+from utils import get_percentile, report
+
+
+def get_exchange(glovar, size: int, seed: int = 79) -> list:
+    # Get exchange messages that declare messages and update scores
+    from plugins.functions.channel import format_data
+
+    random = Random(seed)
+    result = []
+
+    for i in range(size):
+        if random.random() < 0.5:
+            text = format_data("CLEAN", ["TIP", "USER"], "update", "declare",
+                               {"group_id": GROUP_ID, "message_id": i + 1})
+        else:
+            text = format_data("NOSPAM", ["TIP", "USER"], "update", "score",
+                               {"id": 100000 + random.randrange(1000), "score": 0.6})
+
+        message = get_message(unescape(sub(r"</?pre>", "", text)), gid=glovar.exchange_channel_id)
+        message.chat.type = "channel"
+        message.from_user = None
+        result.append(message)
+
+    return result
+
+
+def get_joins(size: int, seed: int = 79) -> list:
+    # Get new chat members messages, some of them have more than one member
+    random = Random(seed)
+    result = []
+
+    for i in range(size):
+        members = [get_user(200000 + i * 10 + j) for j in range(random.choice([1, 1, 1, 2, 5]))]
+        result.append(get_message("", uid=members[0].id, new_chat_members=members, service=True))
+
+    return result
+
+
+def get_lock_stats(histograms: dict, name: str) -> Dict[str, Union[float, int, str]]:
+    # Get the wait and hold time of a lock from the metrics histograms
+    wait = histograms.get(("tip_lock_wait_seconds", (("lock", name),)), {})
+    hold = histograms.get(("tip_lock_hold_seconds", (("lock", name),)), {})
+
+    return {
+        "name": f"lock_{name}",
+        "acquires": wait.get("count", 0),
+        "wait_s": wait.get("sum", 0.0),
+        "wait_max_us": wait.get("max", 0.0) * 1e6,
+        "hold_s": hold.get("sum", 0.0),
+        "hold_max_us": hold.get("max", 0.0) * 1e6
+    }
+
+
+def replay(jobs: List[Tuple[str, Callable, tuple]], workers: int) -> Dict[str, List[float]]:
+    # Run the handlers like the dispatcher of pyrogram does, with a fixed number of workers
+    latencies: Dict[str, List[float]] = {}
+    lock = Lock()
+
+    def run(name: str, target: Callable, args: tuple) -> None:
+        start = perf_counter()
+        target(*args)
+        secs = perf_counter() - start
+
+        with lock:
+            latencies.setdefault(name, []).append(secs)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for name, target, args in jobs:
+            executor.submit(run, name, target, args)
+
+    return latencies
+
+
+def main() -> None:
+    # Replay message streams through the handlers against a fake client
+    parser = ArgumentParser(description="Replay message streams through the handlers against a fake client")
+    parser.add_argument("-m", "--messages", type=int, default=2000)
+    parser.add_argument("-j", "--joins", type=int, default=200)
+    parser.add_argument("-e", "--exchange", type=int, default=500)
+    parser.add_argument("-w", "--workers", type=int, default=4, help="workers of the client")
+    parser.add_argument("-r", "--rules", type=int, default=200, help="rules of each word type")
+    parser.add_argument("-l", "--latency", type=float, default=50, help="API latency in milliseconds")
+    parser.add_argument("-f", "--flood", type=float, default=0.0, help="chance of an API call raising FloodWait")
+    parser.add_argument("-o", "--output", default="")
+    args = parser.parse_args()
+
+    prepare()
+
+    from plugins import glovar
+    from plugins.functions.dispatch import queues
+    from plugins.functions.metrics import MeteredLock, histograms
+    from plugins.handlers.message import check, check_join, process_data
+
+    load_rules(glovar, args.rules)
+    set_group(glovar, welcome=True)
+    client = Client(latency=args.latency / 1000, jitter=args.latency / 2000, flood_rate=args.flood)
+
+    # Meter the locks like the metrics mode does
+    glovar.metrics = True
+
+    for name in list(glovar.locks):
+        glovar.locks[name] = MeteredLock(name)
+
+    # Mix the streams
+    jobs = [("check", check, (client, message)) for message in get_stream(args.messages)]
+    jobs += [("check_join", check_join, (client, message)) for message in get_joins(args.joins)]
+    jobs += [("process_data", process_data, (client, message)) for message in get_exchange(glovar, args.exchange)]
+    Random(79).shuffle(jobs)
+
+    # Sample the thread count
+    threads = []
+    stop = Event()
+
+    def sample() -> None:
+        while not stop.is_set():
+            threads.append(active_count())
+            sleep(0.01)
+
+    Thread(target=sample, daemon=True).start()
+
+    start = perf_counter()
+    latencies = replay(jobs, args.workers)
+    handled = perf_counter() - start
+
+    # Wait for the outgoing calls
+    while any(queues.values()):
+        sleep(0.01)
+
+    total = perf_counter() - start
+    stop.set()
+
+    results = [{
+        "name": "load",
+        "jobs": len(jobs),
+        "workers": args.workers,
+        "handled_s": handled,
+        "total_s": total,
+        "throughput": len(jobs) / handled if handled else 0.0,
+        "threads_max": max(threads or [active_count()]),
+        "threads_mean": sum(threads) / len(threads) if threads else 0.0
+    }]
+
+    for name, values in sorted(latencies.items()):
+        values.sort()
+        results.append({
+            "name": f"handler_{name}",
+            "count": len(values),
+            "p50_us": get_percentile(values, 50) * 1e6,
+            "p95_us": get_percentile(values, 95) * 1e6,
+            "p99_us": get_percentile(values, 99) * 1e6,
+            "max_us": values[-1] * 1e6
+        })
+
+    for method, stats in sorted(client.get_stats().items()):
+        results.append(dict(stats, name=f"api_{method}"))
+
+    results += [get_lock_stats(histograms, name) for name in glovar.locks]
+
+    report(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
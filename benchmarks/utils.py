@@ -0,0 +1,72 @@
+# SCP-079-TIP - Here's a tip
+# Copyright (C) 2019-2020 SCP-079 <https://scp-079.org>
+#
+# This file is part of SCP-079-TIP.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import sys
+from json import dumps
+from time import perf_counter
+from typing import Callable, Dict, List, Union
+
+
+def get_percentile(values: List[float], percent: float) -> float:
+    # Get the percentile of sorted values
+    if not values:
+        return 0.0
+
+    index = min(len(values) - 1, int(round(percent / 100 * (len(values) - 1))))
+
+    return values[index]
+
+
+def measure(name: str, target: Callable, args: tuple = (), iterations: int = 1000,
+            warmup: int = 10) -> Dict[str, Union[float, int, str]]:
+    # Measure the throughput and latency of a function
+    for _ in range(warmup):
+        target(*args)
+
+    latencies = []
+    begin = perf_counter()
+
+    for _ in range(iterations):
+        start = perf_counter()
+        target(*args)
+        latencies.append(perf_counter() - start)
+
+    total = perf_counter() - begin
+    latencies.sort()
+
+    return {
+        "name": name,
+        "iterations": iterations,
+        "throughput": iterations / total if total else 0.0,
+        "mean_us": total / iterations * 1e6,
+        "p50_us": get_percentile(latencies, 50) * 1e6,
+        "p95_us": get_percentile(latencies, 95) * 1e6,
+        "p99_us": get_percentile(latencies, 99) * 1e6,
+        "max_us": latencies[-1] * 1e6
+    }
+
+
+def report(results: List[dict], output: str = "") -> None:
+    # Print the results as JSON lines, or write them to a file
+    text = "\n".join(dumps(result, ensure_ascii=False, sort_keys=True) for result in results) + "\n"
+
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        sys.stdout.write(text)
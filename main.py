@@ -25,9 +25,11 @@ from apscheduler.schedulers.background import BackgroundScheduler
 from pyrogram import Client
 
 from plugins import glovar
+from plugins.functions.file import write_snapshot
+from plugins.functions.metrics import instrument_client, start_metrics
 from plugins.functions.timers import backup_files, interval_min_01, log_rotation
-from plugins.functions.timers import resend_link, reset_data, send_count, update_admins, update_status
-from plugins.start import init, renew
+from plugins.functions.timers import resend_link, reset_data, send_count, send_metrics, update_admins, update_status
+from plugins.start import init, preload, profile, renew
 
 # Enable logging
 logger = logging.getLogger(__name__)
@@ -38,6 +40,9 @@ init()
 # Renew session
 renew()
 
+# Metrics
+start_metrics()
+
 # Config session
 app = Client(
     session_name="bot",
@@ -46,6 +51,11 @@ app = Client(
     config_file=glovar.CONFIG_PATH
 )
 app.start()
+instrument_client(app)
+profile(app)
+
+# Load the rules in the background while the client is handling updates
+preload()
 
 # Send online status
 update_status(app, "online")
@@ -60,6 +70,10 @@ scheduler.add_job(send_count, "cron", [app], hour=21)
 scheduler.add_job(reset_data, "cron", [app], day=glovar.date_reset, hour=22)
 scheduler.add_job(update_admins, "cron", [app], hour=22, minute=30)
 scheduler.add_job(log_rotation, "cron", hour=23, minute=59)
+
+if glovar.metrics and glovar.metrics_summary:
+    scheduler.add_job(send_metrics, "interval", [app], minutes=glovar.metrics_summary)
+
 scheduler.start()
 
 # Hold
@@ -67,3 +81,6 @@ app.idle()
 
 # Stop
 app.stop()
+
+# Write the pending changes
+glovar.snapshot and write_snapshot()
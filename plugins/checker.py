@@ -169,6 +169,44 @@ def check_language(values: dict, broken: bool) -> str:
     return result
 
 
+def check_limit(values: dict, broken: bool) -> str:
+    # Check all values in limit section
+    result = ""
+
+    for key in values:
+        if key in {"debug_rate", "exchange_rate"} and values[key] < 0:
+            result += f"[ERROR] [limit] {key} - should be a non-negative integer, 0 means no limit\n"
+        elif key not in {"debug_rate", "exchange_rate"} and values[key] <= 0:
+            result += f"[ERROR] [limit] {key} - should be a positive integer\n"
+
+        if not broken or not result:
+            continue
+
+        raise_error(result)
+
+    return result
+
+
+def check_metrics(values: dict, broken: bool) -> str:
+    # Check all values in metrics section
+    result = ""
+
+    for key in values:
+        if key == "metrics_host" and values[key] in {"", "[DATA EXPUNGED]"}:
+            result += f"[ERROR] [metrics] {key} - please fill a valid address\n"
+        elif key == "metrics_port" and not 0 <= values[key] <= 65535:
+            result += f"[ERROR] [metrics] {key} - should be a valid port, 0 means disabled\n"
+        elif key == "metrics_summary" and values[key] < 0:
+            result += f"[ERROR] [metrics] {key} - should be a non-negative integer, 0 means disabled\n"
+
+        if not broken or not result:
+            continue
+
+        raise_error(result)
+
+    return result
+
+
 def check_mode(values: dict, broken: bool) -> str:
     # Check all values in mode section
     result = ""
@@ -192,7 +230,9 @@ def check_time(values: dict, broken: bool) -> str:
     for key in values:
         if key == "date_reset" and values[key] in {"", "[DATA EXPUNGED]"}:
             result += f"[ERROR] [time] {key} - please fill a correct format string\n"
-        elif key.startswith("time") and values[key] <= 0:
+        elif key == "time_welcome_batch" and values[key] < 0:
+            result += f"[ERROR] [time] {key} - should be a non-negative integer, 0 means disabled\n"
+        elif key.startswith("time") and key != "time_welcome_batch" and values[key] <= 0:
             result += f"[ERROR] [time] {key} - should be a positive integer\n"
 
         if not broken or not result:
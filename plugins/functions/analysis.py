@@ -0,0 +1,233 @@
+# SCP-079-TIP - Here's a tip
+# Copyright (C) 2019-2020 SCP-079 <https://scp-079.org>
+#
+# This file is part of SCP-079-TIP.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+from multiprocessing import TimeoutError, get_context
+from multiprocessing.pool import Pool
+from threading import Lock, RLock
+from typing import Dict, List, Optional, Tuple, Union
+
+from .. import glovar
+from .etc import t2t, thread
+from .file import save
+from .filters import is_ban_text, is_bio_text, is_nm_text, is_regex_text, is_wb_text
+
+# Enable logging
+logger = logging.getLogger(__name__)
+
+# Init the process pool
+pool: Dict[str, Union[int, Pool, None]] = {
+    "executor": None,
+    "version": -1
+}
+
+usage: Dict[Pool, Dict[str, int]] = {}
+# usage = {
+#     Pool: {
+#         "pending": 2,
+#         "stuck": 1
+#     }
+# }
+
+pool_lock = Lock()
+
+
+def analyze(the_type: str, texts: Dict[str, str]) -> bool:
+    # Check if the texts should be ignored, in the process pool if possible
+    result = False
+
+    try:
+        if not glovar.offload:
+            return analyze_texts(the_type, texts)
+
+        executor = get_pool()
+
+        if not executor:
+            return analyze_texts(the_type, texts)
+
+        stuck = False
+
+        try:
+            task = executor.apply_async(run_analysis, (the_type, texts))
+            result, hits = task.get(glovar.analysis_timeout / 1000)
+        except TimeoutError:
+            # Workers do not run the matchers, check again in this thread, where safe_regex can stop a slow rule
+            logger.warning(f"Analyze {the_type} timed out in the process pool")
+            stuck = True
+            return analyze_texts(the_type, texts)
+        finally:
+            release_pool(executor, stuck)
+
+        count_regex_hits(hits)
+    except Exception as e:
+        logger.warning(f"Analyze error: {e}", exc_info=True)
+
+    return result
+
+
+def analyze_texts(the_type: str, texts: Dict[str, str]) -> bool:
+    # The text analysis stage of the check handlers, texts are raw and normalized here
+    result = False
+
+    try:
+        if the_type == "join":
+            name = t2t(texts.get("name", ""), True, True)
+
+            if name and (is_nm_text(name) or is_wb_text(name, False)):
+                return True
+
+            bio = t2t(texts.get("bio", ""), True, True)
+
+            if bio and (is_bio_text(bio) or is_wb_text(bio, False)):
+                return True
+
+            return False
+
+        # Check the forward from name
+        forward_name = t2t(texts.get("forward_name", ""), True, True)
+
+        if forward_name and is_nm_text(forward_name):
+            return True
+
+        # Check the user's name
+        name = t2t(texts.get("name", ""), True, True)
+
+        if name and is_nm_text(name):
+            return True
+
+        # Check the text
+        message_text = t2t(texts.get("text", ""), True, True)
+
+        if is_ban_text(message_text, False):
+            return True
+
+        if is_regex_text("del", message_text):
+            return True
+
+        # File name
+        filename = t2t(texts.get("filename", ""), True, True)
+
+        if is_ban_text(filename, False):
+            return True
+
+        if is_regex_text("fil", filename):
+            return True
+
+        if is_regex_text("del", filename):
+            return True
+    except Exception as e:
+        logger.warning(f"Analyze texts error: {e}", exc_info=True)
+
+    return result
+
+
+def count_regex_hits(hits: List[Tuple[str, str]]) -> bool:
+    # Count the rules that hit in the workers
+    result = False
+
+    try:
+        if not hits:
+            return True
+
+        word_types = set()
+
+        for word_type, word in hits:
+            words = eval(f"glovar.{word_type}_words")
+
+            if word not in words:
+                continue
+
+            words[word] = words.get(word, 0) + 1
+            word_types.add(word_type)
+
+        for word_type in word_types:
+            save(f"{word_type}_words")
+
+        result = True
+    except Exception as e:
+        logger.warning(f"Count regex hits error: {e}", exc_info=True)
+
+    return result
+
+
+def get_pool() -> Optional[Pool]:
+    # Get the process pool for a task, fork new workers if the rules changed
+    result = None
+
+    try:
+        with pool_lock:
+            if not pool["executor"] or pool["version"] != glovar.regex_version:
+                old = pool["executor"]
+                pool["version"] = glovar.regex_version
+                pool["executor"] = get_context("fork").Pool(glovar.processes, init_worker)
+                usage[pool["executor"]] = {
+                    "pending": 0,
+                    "stuck": 0
+                }
+                old and thread(release_pool, (old, False, False))
+
+            result = pool["executor"]
+            usage[result]["pending"] += 1
+    except Exception as e:
+        logger.warning(f"Get pool error: {e}", exc_info=True)
+
+    return result
+
+
+def init_worker() -> None:
+    # Init the forked worker, the locks may be held by other threads of the parent
+    glovar.locks = {name: Lock() for name in glovar.locks}
+    glovar.lazy_lock = RLock()
+    glovar.metrics = False
+    glovar.regex_cost = False
+    glovar.safe_regex = False
+    glovar.worker = True
+
+
+def release_pool(executor: Pool, stuck: bool, done: bool = True) -> bool:
+    # Release a task of the pool, a pool with a stuck task is retired and terminated after the others finished
+    result = False
+
+    try:
+        with pool_lock:
+            if stuck:
+                usage[executor]["stuck"] += 1
+            elif done:
+                usage[executor]["pending"] -= 1
+
+            if stuck and pool["executor"] is executor:
+                pool["executor"] = None
+
+            drained = pool["executor"] is not executor and usage[executor]["pending"] == usage[executor]["stuck"]
+            drained and usage.pop(executor)
+
+        drained and executor.terminate()
+
+        result = True
+    except Exception as e:
+        logger.warning(f"Release pool error: {e}", exc_info=True)
+
+    return result
+
+
+def run_analysis(the_type: str, texts: Dict[str, str]) -> Tuple[bool, List[Tuple[str, str]]]:
+    # Run in the worker, return the result and the rules that hit
+    glovar.regex_hits = []
+    result = analyze_texts(the_type, texts)
+
+    return result, glovar.regex_hits
@@ -23,9 +23,11 @@ from typing import List, Union
 from pyrogram import Chat, Client
 
 from .. import glovar
-from .decorators import threaded
+from .crypto import crypt_file
+from .decorators import dispatched, threaded
 from .etc import code, code_block, general_link, lang, thread
-from .file import crypt_file, data_to_file, delete_file, get_new_path
+from .file import data_to_file, delete_file, get_new_path, save
+from .metrics import get_regex_costs
 from .telegram import get_group_info, send_document, send_message
 
 # Enable logging
@@ -61,17 +63,31 @@ def exchange_to_hide(client: Client) -> bool:
 
 
 def format_data(sender: str, receivers: List[str], action: str, action_type: str,
-                data: Union[bool, dict, int, str] = None) -> str:
+                data: Union[bool, dict, int, str] = None, compact: bool = False) -> str:
     # Get exchange string
     result = ""
 
     try:
+        if compact:
+            data = {
+                "v": glovar.wire_version,
+                "f": sender,
+                "t": receivers,
+                "a": action,
+                "y": action_type,
+                "d": data
+            }
+            result = code_block(dumps(data, ensure_ascii=False, separators=(",", ":")))
+            return result
+
+        # Advertise the compact format to other bots
         data = {
             "from": sender,
             "to": receivers,
             "action": action,
             "type": action_type,
-            "data": data
+            "data": data,
+            "v": glovar.wire_version
         }
         result = code_block(dumps(data, indent=4))
     except Exception as e:
@@ -115,7 +131,19 @@ def get_debug_text(client: Client, context: Union[int, Chat, List[int]]) -> str:
     return result
 
 
-@threaded()
+def is_wire_supported(receivers: List[str], version: int) -> bool:
+    # Check if all receivers support the wire version
+    result = False
+
+    try:
+        result = all(glovar.wire_versions.get(receiver, 0) >= version for receiver in receivers)
+    except Exception as e:
+        logger.warning(f"Is wire supported error: {e}", exc_info=True)
+
+    return result
+
+
+@dispatched("debug")
 def send_debug(client: Client, chat: Chat, action: str, aid: int,
                config_type: str = "", more: str = "") -> bool:
     # Send the debug message
@@ -142,7 +170,40 @@ def send_debug(client: Client, chat: Chat, action: str, aid: int,
     return result
 
 
-@threaded()
+@dispatched("exchange")
+def share_backup(client: Client, file: str, digest: str) -> bool:
+    # Share a data file with BACKUP, remember its hash after it was sent
+    result = False
+
+    try:
+        file_path = data_to_file(eval(f"glovar.{file}"), True)
+
+        if not file_path:
+            return False
+
+        # Send in this job, only True means the document was sent
+        result = share_data.__wrapped__(
+            client=client,
+            receivers=["BACKUP"],
+            action="backup",
+            action_type="data",
+            data=file,
+            file=file_path,
+            encrypt=False
+        )
+
+        if result is not True:
+            return False
+
+        glovar.backup_hashes[file] = digest
+        save("backup_hashes")
+    except Exception as e:
+        logger.warning(f"Share backup error: {e}", exc_info=True)
+
+    return result
+
+
+@dispatched("exchange")
 def share_data(client: Client, receivers: List[str], action: str, action_type: str,
                data: Union[bool, dict, int, str] = None, file: str = None, encrypt: bool = True) -> bool:
     # Use this function to share data in the channel
@@ -160,6 +221,9 @@ def share_data(client: Client, receivers: List[str], action: str, action_type: s
         else:
             channel_id = glovar.exchange_channel_id
 
+        # Use the compact format only if all receivers support it
+        compact = glovar.compact and is_wire_supported(receivers, 1)
+
         # Plain text
         if not file:
             text = format_data(
@@ -167,7 +231,8 @@ def share_data(client: Client, receivers: List[str], action: str, action_type: s
                 receivers=receivers,
                 action=action,
                 action_type=action_type,
-                data=data
+                data=data,
+                compact=compact
             )
             result = send_message(client, channel_id, text)
             return ((result is False and not glovar.should_hide)
@@ -179,7 +244,8 @@ def share_data(client: Client, receivers: List[str], action: str, action_type: s
             receivers=receivers,
             action=action,
             action_type=action_type,
-            data=data
+            data=data,
+            compact=compact
         )
 
         if encrypt:
@@ -198,7 +264,7 @@ def share_data(client: Client, receivers: List[str], action: str, action_type: s
 
         # Delete the tmp file
         for f in {file, file_path}:
-            f.startswith("tmp/") and thread(delete_file, (f,))
+            f.startswith(f"{glovar.TMP_PATH}/") and thread(delete_file, (f,))
 
         result = bool(result)
     except Exception as e:
@@ -241,14 +307,32 @@ def share_regex_count(client: Client, word_type: str) -> bool:
         if not eval(f"glovar.{word_type}_words"):
             return False
 
-        file = data_to_file(eval(f"glovar.{word_type}_words"))
+        file = data_to_file(eval(f"glovar.{word_type}_words"), True)
         result = share_data(
             client=client,
             receivers=["REGEX"],
             action="regex",
             action_type="count",
             data=f"{word_type}_words",
-            file=file
+            file=file,
+            encrypt=False
+        )
+
+        # Share the slowest rules with the counts
+        costs = glovar.regex_cost and get_regex_costs(word_type)
+
+        if not costs:
+            return result
+
+        file = data_to_file(costs, True)
+        share_data(
+            client=client,
+            receivers=["REGEX"],
+            action="regex",
+            action_type="cost",
+            data=f"{word_type}_words",
+            file=file,
+            encrypt=False
         )
     except Exception as e:
         logger.warning(f"Share regex update error: {e}", exc_info=True)
@@ -261,14 +345,15 @@ def share_regex_remove(client: Client, word_type: str, word: str) -> bool:
     result = False
 
     try:
-        file = data_to_file(word)
+        file = data_to_file(word, True)
         result = share_data(
             client=client,
             receivers=["REGEX"],
             action="regex",
             action_type="remove",
             data=f"{word_type}_words",
-            file=file
+            file=file,
+            encrypt=False
         )
     except Exception as e:
         logger.warning(f"Share regex remove error: {e}", exc_info=True)
@@ -20,6 +20,7 @@ import logging
 
 from pyrogram import Client, Message
 
+from .dispatch import dispatch
 from .etc import code, delay, get_text, lang, thread
 from .filters import is_class_c
 from .group import delete_message
@@ -94,7 +95,7 @@ def command_error(client: Client, message: Message, action: str, error: str,
 
         # Send the message
         if report:
-            thread(send_report_message, (10, client, cid, text))
+            dispatch("tip", send_report_message, (10, client, cid, text))
         else:
             thread(send_message, (client, cid, text, mid))
 
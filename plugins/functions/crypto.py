@@ -0,0 +1,125 @@
+# SCP-079-TIP - Here's a tip
+# Copyright (C) 2019-2020 SCP-079 <https://scp-079.org>
+#
+# This file is part of SCP-079-TIP.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+from functools import lru_cache
+from io import BytesIO
+from typing import List, Union
+
+from cryptography.fernet import Fernet
+from pyAesCrypt import decryptStream, encryptStream
+
+from .. import glovar
+
+# Enable logging
+logger = logging.getLogger(__name__)
+
+# Init the buffer size of pyAesCrypt
+buffer = 64 * 1024
+
+
+def crypt_data(operation: str, data: bytes) -> bytes:
+    # Encrypt or decrypt bytes in memory
+    result = b""
+
+    try:
+        if not data:
+            return b""
+
+        stream_in = BytesIO(data)
+        stream_out = BytesIO()
+
+        if operation == "decrypt":
+            decryptStream(stream_in, stream_out, glovar.password, buffer, len(data))
+        else:
+            encryptStream(stream_in, stream_out, glovar.password, buffer)
+
+        result = stream_out.getvalue()
+    except Exception as e:
+        logger.warning(f"Crypt data error: {e}", exc_info=True)
+
+    return result
+
+
+def crypt_file(operation: str, file_in: str, file_out: str) -> bool:
+    # Encrypt or decrypt a file, it is read into memory at once
+    result = False
+
+    try:
+        if not file_in or not file_out:
+            return False
+
+        with open(file_in, "rb") as f:
+            data = crypt_data(operation, f.read())
+
+        if not data:
+            return False
+
+        with open(file_out, "wb") as f:
+            f.write(data)
+
+        result = True
+    except Exception as e:
+        logger.warning(f"Crypt file error: {e}", exc_info=True)
+
+    return result
+
+
+def crypt_str(operation: str, text: str, key: Union[bytes, str]) -> str:
+    # Encrypt or decrypt a string
+    result = ""
+
+    try:
+        f = get_fernet(key)
+        text = text.encode("utf-8")
+
+        if operation == "decrypt":
+            result = f.decrypt(text)
+        else:
+            result = f.encrypt(text)
+
+        result = result.decode("utf-8")
+    except Exception as e:
+        logger.warning(f"Crypt str error: {e}", exc_info=True)
+
+    return result
+
+
+def decrypt_strs(texts: List[str], key: Union[bytes, str]) -> List[str]:
+    # Decrypt a list of strings, the broken ones become empty strings
+    result = []
+
+    try:
+        f = get_fernet(key)
+
+        for text in texts:
+            try:
+                result.append(f.decrypt(text.encode("utf-8")).decode("utf-8"))
+            except Exception as e:
+                logger.warning(f"Decrypt str error: {e}")
+                result.append("")
+    except Exception as e:
+        logger.warning(f"Decrypt strs error: {e}", exc_info=True)
+
+    return result
+
+
+@lru_cache(maxsize=8)
+def get_fernet(key: Union[bytes, str]) -> Fernet:
+    # Get the Fernet of the key, deriving it is not free
+    return Fernet(key)
@@ -22,12 +22,23 @@ from signal import alarm, ITIMER_REAL, setitimer, SIGALRM, signal
 
 from pyrogram.errors import FloodWait
 
+from .dispatch import dispatch
 from .etc import thread, wait_flood
 
 # Enable logging
 logger = logging.getLogger(__name__)
 
 
+def dispatched(priority: str):
+    # Run with the dispatcher
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            return dispatch(priority, func, args, kwargs)
+        return wrapper
+    return decorator
+
+
 def retry(func):
     # FloodWait retry
     @wraps(func)
@@ -0,0 +1,122 @@
+# SCP-079-TIP - Here's a tip
+# Copyright (C) 2019-2020 SCP-079 <https://scp-079.org>
+#
+# This file is part of SCP-079-TIP.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+from collections import deque
+from threading import Condition, Thread
+from time import time
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from .. import glovar
+
+# Enable logging
+logger = logging.getLogger(__name__)
+
+# Init the dispatcher
+condition = Condition()
+
+dropped: Dict[str, int] = {p: 0 for p in glovar.priorities}
+
+queues: Dict[str, Deque[Tuple[Callable, tuple, Optional[dict]]]] = {p: deque() for p in glovar.priorities}
+
+ready: Dict[str, float] = {p: 0.0 for p in glovar.priorities}
+
+workers: List[Thread] = []
+
+
+def dispatch(priority: str, target: Callable, args: tuple, kwargs: dict = None) -> bool:
+    # Queue an outgoing call in its priority class
+    result = False
+
+    try:
+        if priority not in glovar.priorities:
+            return False
+
+        with condition:
+            # Debug messages are droppable
+            if priority == "debug" and len(queues[priority]) >= glovar.debug_queue:
+                dropped[priority] += 1
+                logger.info(f"Dispatch dropped a {priority} call: {target.__name__}")
+                return False
+
+            queues[priority].append((target, args, kwargs))
+            start_workers()
+            condition.notify()
+
+        result = True
+    except Exception as e:
+        logger.warning(f"Dispatch error: {e}", exc_info=True)
+
+    return result
+
+
+def get_job() -> Tuple[Callable, tuple, Optional[dict]]:
+    # Wait for the next job, the higher priority class first
+    with condition:
+        while True:
+            now = time()
+            wait = None
+
+            for priority in glovar.priorities:
+                if not queues[priority]:
+                    continue
+
+                if ready[priority] > now:
+                    delta = ready[priority] - now
+                    wait = delta if wait is None else min(wait, delta)
+                    continue
+
+                rate = glovar.priorities[priority]
+
+                if rate:
+                    ready[priority] = now + 60 / rate
+
+                return queues[priority].popleft()
+
+            condition.wait(wait)
+
+
+def run_worker() -> None:
+    # Run the dispatcher's worker
+    while True:
+        target, args, kwargs = get_job()
+
+        try:
+            target(*args, **(kwargs or {}))
+        except Exception as e:
+            logger.warning(f"Run worker {target.__name__} error: {e}", exc_info=True)
+
+
+def start_workers() -> bool:
+    # Start the workers on first use, should be called with the condition held
+    result = False
+
+    try:
+        if workers:
+            return True
+
+        for i in range(glovar.senders):
+            t = Thread(target=run_worker, name=f"sender-{i}", daemon=True)
+            t.start()
+            workers.append(t)
+
+        result = True
+    except Exception as e:
+        logger.warning(f"Start workers error: {e}", exc_info=True)
+
+    return result
@@ -17,8 +17,11 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import logging
+from collections import deque
 from datetime import datetime
 from copy import deepcopy
+from functools import lru_cache
+from hashlib import sha256
 from html import escape
 from json import dumps
 from random import choice, uniform
@@ -29,19 +32,16 @@ from time import localtime, sleep, strftime, time
 from typing import Any, Callable, Optional, Union
 from unicodedata import normalize
 
-from cryptography.fernet import Fernet
 from opencc import OpenCC
 from pyrogram import Message, User
 from pyrogram.errors import FloodWait
 
 from .. import glovar
+from .runtime import call_later, call_soon
 
 # Enable logging
 logger = logging.getLogger(__name__)
 
-# Init Opencc
-converter = OpenCC(config="t2s.json")
-
 
 def bold(text: Any) -> str:
     # Get a bold text
@@ -98,31 +98,14 @@ def code_block(text: Any) -> str:
     return ""
 
 
-def crypt_str(operation: str, text: str, key: bytes) -> str:
-    # Encrypt or decrypt a string
-    result = ""
-
-    try:
-        f = Fernet(key)
-        text = text.encode("utf-8")
-
-        if operation == "decrypt":
-            result = f.decrypt(text)
-        else:
-            result = f.encrypt(text)
-
-        result = result.decode("utf-8")
-    except Exception as e:
-        logger.warning(f"Crypt str error: {e}", exc_info=True)
-
-    return result
-
-
 def delay(secs: int, target: Callable, args: list = None) -> bool:
     # Call a function with delay
     result = False
 
     try:
+        if glovar.thread_pool:
+            return call_later(secs, target, args)
+
         t = Timer(secs, target, args)
         t.daemon = True
         result = t.start() or True
@@ -147,6 +130,20 @@ def general_link(text: Union[int, str], link: str) -> str:
     return result
 
 
+def get_canonical(data: Any) -> Any:
+    # Get the canonical form of the data, the order of the sets and the dicts does not change it
+    if isinstance(data, dict):
+        return sorted((repr(k), get_canonical(v)) for k, v in data.items())
+
+    if isinstance(data, (set, frozenset)):
+        return sorted(repr(get_canonical(d)) for d in data)
+
+    if isinstance(data, (deque, list, tuple)):
+        return [get_canonical(d) for d in data]
+
+    return data
+
+
 def get_channel_link(message: Union[int, Message]) -> str:
     # Get a channel reference link
     text = ""
@@ -205,6 +202,24 @@ def get_command_type(message: Message) -> str:
     return result
 
 
+@lru_cache()
+def get_converter() -> OpenCC:
+    # Get the OpenCC converter, it is slow to init
+    return OpenCC(config="t2s.json")
+
+
+def get_digest(data: Any) -> str:
+    # Get the sha256 of the data, it is the same after restarts as long as the data is the same
+    result = ""
+
+    try:
+        result = sha256(repr(get_canonical(data)).encode()).hexdigest()
+    except Exception as e:
+        logger.warning(f"Get digest error: {e}", exc_info=True)
+
+    return result
+
+
 def get_filename(message: Message, normal: bool = False, printable: bool = False) -> str:
     # Get file's filename
     text = ""
@@ -430,7 +445,7 @@ def t2t(text: str, normal: bool, printable: bool, pure: bool = False) -> str:
             result = normalize("NFKC", result)
 
         if glovar.normalize and normal and "Hans" in glovar.lang:
-            result = converter.convert(result)
+            result = get_converter().convert(result)
 
         if printable:
             result = "".join(t for t in result if t.isprintable() or t in {"\n", "\r", "\t"})
@@ -448,6 +463,9 @@ def thread(target: Callable, args: tuple, kwargs: dict = None, daemon: bool = Tr
     result = False
 
     try:
+        if glovar.thread_pool:
+            return call_soon(target, args, kwargs)
+
         t = Thread(target=target, args=args, kwargs=kwargs, daemon=daemon)
         t.daemon = daemon
         result = t.start() or True
@@ -19,53 +19,41 @@
 import logging
 from os import remove
 from os.path import exists
-from pickle import dump
+from pickle import dumps
 from shutil import copyfile, move
+from time import perf_counter
 from typing import Any
 
-from pyAesCrypt import decryptFile, encryptFile
 from pyrogram import Client
 
 from .. import glovar
+from ..snapshot import compress_data, dump_snapshot
+from .crypto import crypt_data
 from .decorators import threaded
-from .etc import random_str
+from .etc import delay, random_str
+from .metrics import observe
 from .telegram import download_media
 
 # Enable logging
 logger = logging.getLogger(__name__)
 
 
-def crypt_file(operation: str, file_in: str, file_out: str) -> bool:
-    # Encrypt or decrypt a file
-    result = False
-
-    try:
-        if not file_in or not file_out:
-            return False
-
-        buffer = 64 * 1024
-
-        if operation == "decrypt":
-            decryptFile(file_in, file_out, glovar.password, buffer)
-        else:
-            encryptFile(file_in, file_out, glovar.password, buffer)
-
-        result = True
-    except Exception as e:
-        logger.warning(f"Crypt file error: {e}", exc_info=True)
-
-    return result
-
-
-def data_to_file(data: Any) -> str:
+def data_to_file(data: Any, encrypt: bool = False) -> str:
     # Save data to a file in tmp directory
     result = ""
 
     try:
         file_path = get_new_path()
+        data = compress_data(dumps(data), glovar.compress_exchange)
+
+        if encrypt:
+            data = crypt_data("encrypt", data)
+
+        if not data:
+            return ""
 
         with open(file_path, "wb") as f:
-            dump(data, f)
+            f.write(data)
 
         result = file_path
     except Exception as e:
@@ -137,6 +125,28 @@ def move_file(src: str, dst: str) -> bool:
     return result
 
 
+def migrate_snapshot() -> bool:
+    # Write the data files from the snapshot after the snapshot mode was disabled, then remove the snapshot
+    result = False
+
+    try:
+        if not glovar.snapshot_migrate:
+            return False
+
+        if not all([save.__wrapped__(file) for file in glovar.file_list]):
+            return False
+
+        delete_file(f"{glovar.PICKLE_PATH}/snapshot")
+        delete_file(f"{glovar.PICKLE_BACKUP_PATH}/snapshot")
+        glovar.snapshot_migrate = False
+
+        result = True
+    except Exception as e:
+        logger.warning(f"Migrate snapshot error: {e}", exc_info=True)
+
+    return result
+
+
 @threaded(daemon=False)
 def save(file: str) -> bool:
     # Save a global variable to a file
@@ -146,11 +156,65 @@ def save(file: str) -> bool:
         if not glovar:
             return False
 
+        if glovar.snapshot:
+            return save_snapshot()
+
+        start = perf_counter()
+
         with open(f"{glovar.PICKLE_BACKUP_PATH}/{file}", "wb") as f:
-            dump(eval(f"glovar.{file}"), f)
+            f.write(compress_data(dumps(eval(f"glovar.{file}")), glovar.compress))
 
         result = copyfile(f"{glovar.PICKLE_BACKUP_PATH}/{file}", f"{glovar.PICKLE_PATH}/{file}")
+        observe("tip_save_seconds", perf_counter() - start, {"file": file})
     except Exception as e:
         logger.warning(f"Save error: {e}", exc_info=True)
 
     return result
+
+
+def save_snapshot() -> bool:
+    # Schedule writing the snapshot, the changes in a short time are written together
+    result = False
+
+    try:
+        with glovar.locks["snapshot"]:
+            if glovar.snapshot_pending:
+                return True
+
+            glovar.snapshot_pending = True
+
+        result = delay(glovar.time_snapshot, write_snapshot)
+    except Exception as e:
+        logger.warning(f"Save snapshot error: {e}", exc_info=True)
+
+    return result
+
+
+def write_snapshot() -> bool:
+    # Write all data to the snapshot
+    result = False
+
+    glovar.locks["snapshot"].acquire()
+
+    try:
+        glovar.snapshot_pending = False
+
+        start = perf_counter()
+        sections = {}
+
+        for file in glovar.file_list:
+            # Copy the rule tables that are not loaded yet
+            data = file not in vars(glovar) and glovar.snapshot_sections.get(file)
+            sections[file] = bytes(data) if data else compress_data(dumps(eval(f"glovar.{file}")), glovar.compress)
+
+        result = dump_snapshot(f"{glovar.PICKLE_PATH}/snapshot", sections, f"{glovar.PICKLE_BACKUP_PATH}/snapshot")
+        observe("tip_save_seconds", perf_counter() - start, {"file": "snapshot"})
+    except Exception as e:
+        logger.warning(f"Write snapshot error: {e}", exc_info=True)
+    finally:
+        glovar.locks["snapshot"].release()
+
+    # Write again later if it failed, the changes are kept until a write succeeds
+    result or save_snapshot()
+
+    return result
@@ -19,7 +19,9 @@
 import logging
 import re
 from copy import deepcopy
+from random import random
 from string import ascii_lowercase
+from time import perf_counter
 from typing import Match, Optional, Union
 
 from pyrogram import CallbackQuery, Filters, Message, User
@@ -28,6 +30,8 @@ from .. import glovar
 from .etc import get_text
 from .file import save
 from .ids import init_group_id
+from .matcher import match_text
+from .metrics import observe, update_regex_cost
 from .tip import get_keywords
 
 # Enable logging
@@ -399,9 +403,11 @@ def is_con_text(text: str, ocr: bool) -> bool:
 
 
 def is_declared_message_id(gid: int, mid: int) -> bool:
-    # Check if the message's ID is declared by other bots
+    # Check if the message's ID is declared by other bots, without the lock
     try:
-        if mid in glovar.declared_message_ids.get(gid, set()):
+        message_ids = glovar.declared_message_ids.get(gid)
+
+        if message_ids and mid in message_ids:
             return True
     except Exception as e:
         logger.warning(f"Is declared message id error: {e}", exc_info=True)
@@ -564,19 +570,45 @@ def is_regex_text(word_type: str, text: str, ocr: bool = False, again: bool = Fa
         with glovar.locks["regex"]:
             words = list(eval(f"glovar.{word_type}_words"))
 
-        for word in words:
-            if ocr and "(?# nocr)" in word:
-                continue
+        # Skip the quarantined rules
+        if glovar.regex_quarantine.get(word_type):
+            words = [word for word in words if word not in glovar.regex_quarantine[word_type]]
+
+        start = perf_counter()
+        word = ""
+
+        if glovar.safe_regex:
+            # Find the rule in the matcher process with a time budget
+            word = match_text(word_type, words, text, ocr)
+            result = word and re.search(word, text, re.I | re.S | re.M)
+        else:
+            # Sample the cost of each rule
+            sample = glovar.regex_cost and random() * glovar.regex_sample < 1
+
+            for word in words:
+                if ocr and "(?# nocr)" in word:
+                    continue
+
+                begin = sample and perf_counter()
+                result = re.search(word, text, re.I | re.S | re.M)
+                sample and update_regex_cost(word_type, word, perf_counter() - begin)
+
+                if result:
+                    break
+
+        observe("tip_regex_seconds", perf_counter() - start, {"type": word_type})
 
-            result = re.search(word, text, re.I | re.S | re.M)
+        # Count and return, the workers leave it to the parent
+        if result and glovar.worker:
+            glovar.regex_hits.append((word_type, word))
+            return result
 
-            # Count and return
-            if result:
-                count = eval(f"glovar.{word_type}_words").get(word, 0)
-                count += 1
-                eval(f"glovar.{word_type}_words")[word] = count
-                save(f"{word_type}_words")
-                return result
+        if result:
+            count = eval(f"glovar.{word_type}_words").get(word, 0)
+            count += 1
+            eval(f"glovar.{word_type}_words")[word] = count
+            save(f"{word_type}_words")
+            return result
 
         # Try again
         return is_regex_text(word_type, text, ocr, True)
@@ -17,15 +17,18 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import logging
+from collections import deque
 from typing import Optional
 
 from pyrogram import ChatMember, Client
 
 from .. import glovar
+from .channel import get_debug_text
+from .dispatch import dispatch
 from .etc import code, lang, thread
 from .file import save
 from .ids import init_group_id
-from .telegram import delete_messages, get_chat_member, leave_chat
+from .telegram import delete_messages, get_chat_member, leave_chat, send_message
 
 # Enable logging
 logger = logging.getLogger(__name__)
@@ -38,7 +41,7 @@ def delete_message(client: Client, gid: int, mid: int) -> bool:
             return True
 
         mids = [mid]
-        thread(delete_messages, (client, gid, mids))
+        dispatch("tip", delete_messages, (client, gid, mids))
 
         return True
     except Exception as e:
@@ -120,6 +123,10 @@ def leave_group(client: Client, gid: int) -> bool:
         save("configs")
 
         glovar.declared_message_ids.pop(gid, set())
+        glovar.declared_message_queues.pop(gid, None)
+        glovar.join_times.pop(gid, None)
+        glovar.raid_ids.pop(gid, 0)
+        glovar.templates.pop(gid, {})
         glovar.members.pop(gid, {})
         glovar.keyworded_ids.pop(gid, {})
         glovar.welcomed_ids.pop(gid, set())
@@ -129,3 +136,55 @@ def leave_group(client: Client, gid: int) -> bool:
         logger.warning(f"Leave group error: {e}", exc_info=True)
 
     return False
+
+
+def send_raid_debug(client: Client, gid: int) -> bool:
+    # Send the debug message of a join burst
+    result = False
+
+    try:
+        text = get_debug_text(client, gid)
+        text += (f"{lang('action')}{lang('colon')}{code(lang('action_raid'))}\n"
+                 f"{lang('more')}{lang('colon')}{code(f'{glovar.join_burst} / {glovar.time_raid}s')}\n")
+        result = dispatch("debug", send_message, (client, glovar.debug_channel_id, text))
+    except Exception as e:
+        logger.warning(f"Send raid debug error: {e}", exc_info=True)
+
+    return result
+
+
+def update_joins(client: Client, gid: int, count: int, now: int) -> bool:
+    # Record the joins of a group, return True if the group is in join burst mode
+    result = False
+    started = False
+
+    glovar.locks["join"].acquire()
+
+    try:
+        if glovar.join_times.get(gid) is None:
+            glovar.join_times[gid] = deque(maxlen=glovar.join_burst)
+
+        join_times = glovar.join_times[gid]
+        join_times.extend([now] * min(count, glovar.join_burst))
+
+        # The burst lasts while the window holds enough joins
+        result = len(join_times) == glovar.join_burst and now - join_times[0] < glovar.time_raid
+
+        if not result:
+            glovar.raid_ids.pop(gid, 0)
+            return False
+
+        if glovar.raid_ids.get(gid):
+            return True
+
+        glovar.raid_ids[gid] = now
+        started = True
+    except Exception as e:
+        logger.warning(f"Update joins error: {e}", exc_info=True)
+    finally:
+        glovar.locks["join"].release()
+
+    # Getting the group info may call the API, so the debug message is sent without holding the lock
+    started and send_raid_debug(client, gid)
+
+    return result
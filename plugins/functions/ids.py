@@ -17,7 +17,9 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import logging
+from collections import deque
 from copy import deepcopy
+from heapq import heapify, heappop, heappush
 
 from .. import glovar
 from .file import save
@@ -26,6 +28,38 @@ from .file import save
 logger = logging.getLogger(__name__)
 
 
+def add_declared_message_id(gid: int, mid: int) -> bool:
+    # Add a declared message's id, only keep the recent window, readers do not need the lock
+    result = False
+
+    glovar.locks["declare"].acquire()
+
+    try:
+        message_ids = glovar.declared_message_ids.get(gid)
+        message_queue = glovar.declared_message_queues.get(gid)
+
+        if message_ids is None or message_queue is None:
+            return False
+
+        if mid in message_ids:
+            return True
+
+        # Publish the new id before evicting the oldest one
+        message_ids.add(mid)
+        message_queue.append(mid)
+
+        while len(message_queue) > glovar.declared_window:
+            message_ids.discard(message_queue.popleft())
+
+        result = True
+    except Exception as e:
+        logger.warning(f"Add declared message id error: {e}", exc_info=True)
+    finally:
+        glovar.locks["declare"].release()
+
+    return result
+
+
 def init_group_id(gid: int) -> bool:
     # Init group data
     try:
@@ -52,7 +86,10 @@ def init_group_id(gid: int) -> bool:
             save("configs")
 
         if glovar.declared_message_ids.get(gid) is None:
-            glovar.declared_message_ids[gid] = set()
+            with glovar.locks["declare"]:
+                if glovar.declared_message_ids.get(gid) is None:
+                    glovar.declared_message_queues[gid] = deque()
+                    glovar.declared_message_ids[gid] = set()
 
         if glovar.members.get(gid) is None:
             glovar.members[gid] = {}
@@ -82,3 +119,67 @@ def init_user_id(uid: int) -> bool:
         logger.warning(f"Init user id {uid} error: {e}", exc_info=True)
 
     return False
+
+
+def add_watch_id(the_type: str, uid: int, until: int) -> bool:
+    # Add a watch user, index the until time for the purge
+    result = False
+
+    glovar.locks["watch"].acquire()
+
+    try:
+        glovar.watch_ids[the_type][uid] = until
+        heappush(glovar.watch_heap, (until, the_type, uid))
+
+        result = True
+    except Exception as e:
+        logger.warning(f"Add watch id error: {e}", exc_info=True)
+    finally:
+        glovar.locks["watch"].release()
+
+    return result
+
+
+def set_watch_ids(watch_ids: dict) -> bool:
+    # Replace the watch users, rebuild the index of the until time
+    result = False
+
+    glovar.locks["watch"].acquire()
+
+    try:
+        glovar.watch_ids = watch_ids
+        glovar.watch_heap = [(until, the_type, uid)
+                             for the_type in watch_ids for uid, until in watch_ids[the_type].items()]
+        heapify(glovar.watch_heap)
+
+        result = True
+    except Exception as e:
+        logger.warning(f"Set watch ids error: {e}", exc_info=True)
+    finally:
+        glovar.locks["watch"].release()
+
+    return result
+
+
+def purge_watch_ids(now: int) -> bool:
+    # Remove the expired watch users, return True if any was removed
+    result = False
+
+    glovar.locks["watch"].acquire()
+
+    try:
+        while glovar.watch_heap and glovar.watch_heap[0][0] <= now:
+            until, the_type, uid = heappop(glovar.watch_heap)
+
+            # The user may be removed or watched again after it was indexed
+            if glovar.watch_ids[the_type].get(uid) != until:
+                continue
+
+            glovar.watch_ids[the_type].pop(uid, 0)
+            result = True
+    except Exception as e:
+        logger.warning(f"Purge watch ids error: {e}", exc_info=True)
+    finally:
+        glovar.locks["watch"].release()
+
+    return result
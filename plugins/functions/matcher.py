@@ -0,0 +1,233 @@
+# SCP-079-TIP - Here's a tip
+# Copyright (C) 2019-2020 SCP-079 <https://scp-079.org>
+#
+# This file is part of SCP-079-TIP.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+import re
+from multiprocessing import Pipe, Process, Value
+from multiprocessing.connection import Connection
+from queue import Queue
+from threading import Lock
+from time import monotonic
+from typing import Dict, List, Optional, Union
+
+from .. import glovar
+from .file import save
+from .metrics import inc, update_regex_cost
+
+# Enable logging
+logger = logging.getLogger(__name__)
+
+# Init the matchers
+flags = re.I | re.S | re.M
+
+idle: Queue = Queue()
+
+matchers: List[Dict[str, Union[Connection, Dict[str, List[str]], Process, Value]]] = []
+# matchers = [
+#     {
+#         "conn": Connection,
+#         "current": Value,
+#         "process": Process,
+#         "rules": {
+#             "ad": ["regex"]
+#         },
+#         "started": Value
+#     }
+# ]
+
+matcher_lock = Lock()
+
+max_restarts = 3
+
+
+def get_matcher() -> Optional[dict]:
+    # Get an idle matcher, start them on first use
+    result = None
+
+    try:
+        with matcher_lock:
+            while len(matchers) < glovar.matchers:
+                matcher = start_matcher()
+                matchers.append(matcher)
+                idle.put(matcher)
+
+        result = idle.get()
+    except Exception as e:
+        logger.warning(f"Get matcher error: {e}", exc_info=True)
+
+    return result
+
+
+def match_text(word_type: str, words: List[str], text: str, ocr: bool) -> str:
+    # Find the first rule that hits the text in a matcher process, rules that run out of time are quarantined
+    result = ""
+
+    matcher = get_matcher()
+
+    if not matcher:
+        return ""
+
+    try:
+        begin = 0
+        restarts = 0
+
+        while begin < len(words):
+            # The rules are compiled before the time budget starts
+            if matcher["rules"].get(word_type) != words:
+                matcher["conn"].send(("rules", word_type, words))
+                matcher["conn"].recv()
+                matcher["rules"][word_type] = words
+
+            matcher["current"].value = -1
+            matcher["conn"].send(("match", word_type, text, ocr, begin))
+            index = wait_matcher(matcher)
+
+            if index is not None:
+                return words[index] if index >= 0 else ""
+
+            # A rule is still running, restart the matcher and go on with the next rule
+            index = matcher["current"].value
+            index >= 0 and quarantine_rule(word_type, words[index])
+            matcher = restart_matcher(matcher)
+            restarts += 1
+
+            if restarts >= max_restarts:
+                logger.warning(f"Match text gave up after {restarts} restarts")
+                return ""
+
+            begin = max(begin, index + 1)
+    except Exception as e:
+        logger.warning(f"Match text error: {e}", exc_info=True)
+        matcher = restart_matcher(matcher)
+    finally:
+        idle.put(matcher)
+
+    return result
+
+
+def quarantine_rule(word_type: str, word: str) -> bool:
+    # Stop using a rule that runs out of time
+    result = False
+
+    try:
+        glovar.regex_quarantine.setdefault(word_type, set()).add(word)
+        glovar.regex_quarantined.append((word_type, word))
+        glovar.regex_version += 1
+        save("regex_quarantine")
+        update_regex_cost(word_type, word, glovar.regex_timeout / 1000)
+        inc("tip_regex_quarantined_total", 1, {"type": word_type})
+        logger.warning(f"Quarantined {word_type} rule after {glovar.regex_timeout}ms: {word}")
+
+        result = True
+    except Exception as e:
+        logger.warning(f"Quarantine rule error: {e}", exc_info=True)
+
+    return result
+
+
+def restart_matcher(matcher: dict) -> dict:
+    # Terminate the matcher and start a new one in its place
+    try:
+        matcher["process"].terminate()
+        matcher["process"].join(1)
+        matcher["conn"].close()
+    except Exception as e:
+        logger.warning(f"Terminate matcher error: {e}", exc_info=True)
+
+    new = start_matcher()
+
+    with matcher_lock:
+        matchers[matchers.index(matcher)] = new
+
+    return new
+
+
+def run_matcher(conn: Connection, current: Value, started: Value) -> None:
+    # Run in the matcher process, the index of the running rule and its start time are shared with the parent
+    rules = {}
+
+    while True:
+        try:
+            request = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+
+        if request[0] == "rules":
+            _, word_type, words = request
+            rules[word_type] = []
+
+            for word in words:
+                try:
+                    rules[word_type].append((word, re.compile(word, flags)))
+                except re.error:
+                    rules[word_type].append((word, None))
+
+            conn.send(True)
+            continue
+
+        _, word_type, text, ocr, begin = request
+        patterns = rules.get(word_type, [])
+        index = -1
+
+        for i in range(begin, len(patterns)):
+            word, pattern = patterns[i]
+
+            if not pattern or (ocr and "(?# nocr)" in word):
+                continue
+
+            started.value = monotonic()
+            current.value = i
+
+            if pattern.search(text):
+                index = i
+                break
+
+        conn.send(index)
+
+
+def start_matcher() -> dict:
+    # Start a matcher process
+    parent, child = Pipe()
+    current = Value("i", -1, lock=False)
+    started = Value("d", 0.0, lock=False)
+    process = Process(target=run_matcher, args=(child, current, started), name="matcher", daemon=True)
+    process.start()
+    child.close()
+
+    return {
+        "conn": parent,
+        "current": current,
+        "process": process,
+        "rules": {},
+        "started": started
+    }
+
+
+def wait_matcher(matcher: dict) -> Optional[int]:
+    # Wait for the result, return None if a single rule runs out of time
+    budget = glovar.regex_timeout / 1000
+    step = min(budget / 10, 0.01)
+
+    while not matcher["conn"].poll(step):
+        if matcher["current"].value < 0:
+            continue
+
+        if monotonic() - matcher["started"].value > budget:
+            return None
+
+    return matcher["conn"].recv()
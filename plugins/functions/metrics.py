@@ -0,0 +1,584 @@
+# SCP-079-TIP - Here's a tip
+# Copyright (C) 2019-2020 SCP-079 <https://scp-079.org>
+#
+# This file is part of SCP-079-TIP.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+import sys
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from os.path import basename
+from re import sub
+from threading import Lock, Thread, enumerate as enumerate_threads
+from time import perf_counter
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from pyrogram import Client
+from pyrogram.errors import FloodWait
+
+from .. import glovar
+from .dispatch import dropped, queues
+
+# Enable logging
+logger = logging.getLogger(__name__)
+
+# Init the metrics
+buckets: Tuple[float, ...] = (0.0001, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+# counters = {
+#     ("name", (("label", "value"),)): 0.0
+# }
+
+histograms: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], Dict[str, Union[float, int, List[int]]]] = {}
+# histograms = {
+#     ("name", (("label", "value"),)): {
+#         "buckets": [0],
+#         "count": 0,
+#         "sum": 0.0,
+#         "max": 0.0
+#     }
+# }
+
+helps: Dict[str, Tuple[str, str]] = {
+    "tip_api_flood_seconds_total": ("counter", "FloodWait seconds asked by Telegram per method"),
+    "tip_api_seconds": ("histogram", "Telegram API call latency per method"),
+    "tip_dispatch_dropped_total": ("counter", "Dropped outgoing calls per priority"),
+    "tip_dispatch_queue": ("gauge", "Queued outgoing calls per priority"),
+    "tip_handler_seconds": ("histogram", "Handler latency per handler"),
+    "tip_lock_hold_seconds": ("histogram", "Time the lock was held per glovar.locks key"),
+    "tip_lock_wait_seconds": ("histogram", "Wait time to acquire the lock per glovar.locks key"),
+    "tip_regex_quarantined_total": ("counter", "Regex rules quarantined after running out of time per word type"),
+    "tip_regex_seconds": ("histogram", "Regex evaluation time per word type"),
+    "tip_route_seconds": ("histogram", "Exchange data handling time per route"),
+    "tip_save_seconds": ("histogram", "Time to persist the data per file"),
+    "tip_threads": ("gauge", "Running threads per name")
+}
+
+lock_sites: Dict[Tuple[str, str], Dict[str, Union[float, int]]] = {}
+# lock_sites = {
+#     ("message", "message.py:50:check"): {
+#         "count": 0,
+#         "hold": 0.0,
+#         "hold_max": 0.0,
+#         "wait": 0.0,
+#         "wait_max": 0.0
+#     }
+# }
+
+metrics_lock = Lock()
+
+regex_costs: Dict[str, Dict[str, Dict[str, Union[bool, float, int]]]] = {}
+# regex_costs = {
+#     "ad": {
+#         "regex": {
+#             "count": 0,
+#             "total": 0.0,
+#             "max": 0.0,
+#             "slow": False
+#         }
+#     }
+# }
+
+# The client methods called in telegram.py, raw queries are sent by send()
+methods: List[str] = ["answer_callback_query", "delete_messages", "download_media", "edit_message_text",
+                      "export_chat_invite_link", "get_chat", "get_chat_member", "get_chat_members", "leave_chat",
+                      "pin_chat_message", "resolve_peer", "send", "send_document", "send_message", "send_photo"]
+
+
+class MeteredLock:
+    # A lock that records the wait time, the hold time and the holder's call site
+
+    def __init__(self, name: str, lock: Lock = None):
+        self.name = name
+        self.lock = lock or Lock()
+        self.holder = ""
+        self.since = 0.0
+        self.wait = 0.0
+
+    def __enter__(self) -> bool:
+        return self.acquire()
+
+    def __exit__(self, *_) -> None:
+        self.release()
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        start = perf_counter()
+        result = self.lock.acquire(blocking, timeout)
+
+        if not result:
+            return result
+
+        # Only the holder writes these
+        self.since = perf_counter()
+        self.wait = self.since - start
+        self.holder = get_site()
+        observe("tip_lock_wait_seconds", self.wait, {"lock": self.name})
+
+        return result
+
+    def locked(self) -> bool:
+        return self.lock.locked()
+
+    def release(self) -> None:
+        hold = perf_counter() - self.since
+        holder, wait = self.holder, self.wait
+        self.holder = ""
+        self.lock.release()
+
+        observe("tip_lock_hold_seconds", hold, {"lock": self.name})
+        update_site(self.name, holder, wait, hold)
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    # Serve the metrics endpoint
+
+    def do_GET(self) -> None:
+        path = self.path.split("?")[0]
+
+        if path in {"/", "/metrics"}:
+            body = get_text().encode("utf-8")
+        elif path == "/locks":
+            body = get_locks().encode("utf-8")
+        else:
+            self.send_error(404)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_) -> None:
+        return None
+
+
+def get_key(name: str, labels: Dict[str, str] = None) -> Tuple[str, Tuple[Tuple[str, str], ...]]:
+    # Get the key of a metric
+    return name, tuple(sorted((labels or {}).items()))
+
+
+def get_labels(labels: Tuple[Tuple[str, str], ...], extra: str = "") -> str:
+    # Get the label string in Prometheus text format
+    pairs = []
+
+    for k, v in labels:
+        v = str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{k}="{v}"')
+
+    extra and pairs.append(extra)
+
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def get_locks(limit: int = 10) -> str:
+    # Get the lock report, the current holders and the call sites that hold or starve the locks the most
+    result = ""
+
+    try:
+        now = perf_counter()
+
+        for name in sorted(glovar.locks):
+            lock = glovar.locks[name]
+
+            if not isinstance(lock, MeteredLock) or not lock.locked() or not lock.holder:
+                continue
+
+            result += f"held[{name}] {lock.holder} for {(now - lock.since) * 1000:.0f}ms\n"
+
+        with metrics_lock:
+            items = [(key, dict(value)) for key, value in lock_sites.items()]
+
+        for field in ["hold", "wait"]:
+            items.sort(key=lambda x: x[1][field], reverse=True)
+
+            for (name, site), value in items[:limit]:
+                if not value[field]:
+                    continue
+
+                mean = value[field] / value["count"] * 1000
+                result += (f"{field}[{name}] {site} n={value['count']} total={value[field]:.2f}s "
+                           f"mean={mean:.2f}ms max={value[f'{field}_max'] * 1000:.2f}ms\n")
+    except Exception as e:
+        logger.warning(f"Get locks error: {e}", exc_info=True)
+
+    return result
+
+
+def get_regex_costs(word_type: str) -> Dict[str, Dict[str, Union[bool, float, int]]]:
+    # Get the slowest sampled rules of the word type, the flagged rules are always included
+    result = {}
+
+    try:
+        with metrics_lock:
+            items = [(word, dict(value)) for word, value in regex_costs.get(word_type, {}).items()]
+
+        items.sort(key=lambda x: x[1]["max"], reverse=True)
+
+        for i, (word, value) in enumerate(items):
+            if i >= glovar.regex_top and not value["slow"]:
+                continue
+
+            result[word] = {
+                "count": value["count"],
+                "mean": value["total"] / value["count"],
+                "max": value["max"],
+                "slow": value["slow"]
+            }
+    except Exception as e:
+        logger.warning(f"Get regex costs error: {e}", exc_info=True)
+
+    return result
+
+
+def get_site() -> str:
+    # Get the call site that acquires the lock, outside this file and the threading module
+    result = ""
+
+    try:
+        frame = sys._getframe(1)
+
+        while frame and frame.f_code.co_filename in {__file__, getattr(sys.modules.get("threading"), "__file__", "")}:
+            frame = frame.f_back
+
+        if not frame:
+            return ""
+
+        code = frame.f_code
+        result = f"{basename(code.co_filename)}:{frame.f_lineno}:{code.co_name}"
+    except Exception as e:
+        logger.warning(f"Get site error: {e}", exc_info=True)
+
+    return result
+
+
+def get_summary(limit: int = 20) -> str:
+    # Get the summary of the histograms with the most time spent
+    result = ""
+
+    try:
+        with metrics_lock:
+            items = [(key, dict(value)) for key, value in histograms.items()]
+
+        items.sort(key=lambda x: x[1]["sum"], reverse=True)
+
+        for (name, labels), value in items[:limit]:
+            label = ",".join(v for _, v in labels)
+            mean = value["sum"] / value["count"] * 1000 if value["count"] else 0.0
+            result += (f"{name[4:-8]}[{label}] n={value['count']} "
+                       f"mean={mean:.2f}ms max={value['max'] * 1000:.2f}ms\n")
+
+        with metrics_lock:
+            floods = {key: value for key, value in counters.items() if key[0] == "tip_api_flood_seconds_total"}
+
+        for (_, labels), value in sorted(floods.items(), key=lambda x: x[1], reverse=True):
+            result += f"flood[{','.join(v for _, v in labels)}] {value:.0f}s\n"
+
+        result += f"threads={sum(get_threads().values())}\n"
+    except Exception as e:
+        logger.warning(f"Get summary error: {e}", exc_info=True)
+
+    return result
+
+
+def get_text() -> str:
+    # Get all metrics in Prometheus text format
+    result = ""
+
+    try:
+        with metrics_lock:
+            counter_items = sorted(counters.items())
+            histogram_items = sorted((key, dict(value, buckets=list(value["buckets"])))
+                                     for key, value in histograms.items())
+
+        gauge_items = [(get_key("tip_threads", {"name": name}), value) for name, value in get_threads().items()]
+        gauge_items += [(get_key("tip_dispatch_queue", {"priority": p}), len(queues[p])) for p in queues]
+        counter_items += [(get_key("tip_dispatch_dropped_total", {"priority": p}), dropped[p]) for p in dropped]
+
+        lines = []
+        described = set()
+
+        def describe(name: str) -> None:
+            if name in described:
+                return
+
+            described.add(name)
+            the_type, the_help = helps.get(name, ("untyped", name))
+            lines.append(f"# HELP {name} {the_help}")
+            lines.append(f"# TYPE {name} {the_type}")
+
+        for (name, labels), value in counter_items + gauge_items:
+            describe(name)
+            lines.append(f"{name}{get_labels(labels)} {value}")
+
+        for (name, labels), value in histogram_items:
+            describe(name)
+            total = 0
+
+            for i, bound in enumerate(buckets):
+                total += value["buckets"][i]
+                le = f'le="{bound}"'
+                lines.append(f"{name}_bucket{get_labels(labels, le)} {total}")
+
+            le = 'le="+Inf"'
+            lines.append(f"{name}_bucket{get_labels(labels, le)} {value['count']}")
+            lines.append(f"{name}_sum{get_labels(labels)} {value['sum']}")
+            lines.append(f"{name}_count{get_labels(labels)} {value['count']}")
+
+        result = "\n".join(lines) + "\n"
+    except Exception as e:
+        logger.warning(f"Get text error: {e}", exc_info=True)
+
+    return result
+
+
+def get_threads() -> Dict[str, int]:
+    # Count the running threads by name, without the index
+    result = {}
+
+    try:
+        for t in enumerate_threads():
+            name = sub(r"[-_#]?\d+( \(.+\))?$", "", t.name) or t.name
+            result[name] = result.get(name, 0) + 1
+    except Exception as e:
+        logger.warning(f"Get threads error: {e}", exc_info=True)
+
+    return result
+
+
+def inc(name: str, value: float = 1.0, labels: Dict[str, str] = None) -> bool:
+    # Increase a counter
+    result = False
+
+    try:
+        if not glovar.metrics:
+            return False
+
+        key = get_key(name, labels)
+
+        with metrics_lock:
+            counters[key] = counters.get(key, 0.0) + value
+
+        result = True
+    except Exception as e:
+        logger.warning(f"Inc error: {e}", exc_info=True)
+
+    return result
+
+
+def instrument_client(client: Client) -> bool:
+    # Time the client's API calls and the registered handlers
+    result = False
+
+    try:
+        if not glovar.metrics:
+            return False
+
+        for method in methods:
+            setattr(client, method, metered_api(method, getattr(client, method)))
+
+        for group in client.dispatcher.groups.values():
+            for handler in group:
+                labels = {"handler": handler.callback.__name__}
+                handler.callback = metered("tip_handler_seconds", handler.callback, labels)
+
+        result = True
+    except Exception as e:
+        logger.warning(f"Instrument client error: {e}", exc_info=True)
+
+    return result
+
+
+def metered(name: str, func: Callable, labels: Dict[str, str] = None) -> Callable:
+    # Observe the time spent by the function
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        start = perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            observe(name, perf_counter() - start, labels)
+    return wrapper
+
+
+def metered_api(method: str, func: Callable) -> Callable:
+    # Observe the API call's latency and the FloodWait seconds
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        the_method = method
+
+        if method == "send" and args:
+            the_method = f"raw.{type(args[0]).__name__}"
+
+        start = perf_counter()
+        try:
+            return func(*args, **kwargs)
+        except FloodWait as e:
+            inc("tip_api_flood_seconds_total", e.x, {"method": the_method})
+            raise e
+        finally:
+            observe("tip_api_seconds", perf_counter() - start, {"method": the_method})
+    return wrapper
+
+
+def observe(name: str, secs: float, labels: Dict[str, str] = None) -> bool:
+    # Observe a value in a histogram
+    result = False
+
+    try:
+        if not glovar.metrics:
+            return False
+
+        key = get_key(name, labels)
+
+        with metrics_lock:
+            value = histograms.get(key)
+
+            if value is None:
+                value = histograms[key] = {
+                    "buckets": [0] * len(buckets),
+                    "count": 0,
+                    "sum": 0.0,
+                    "max": 0.0
+                }
+
+            for i, bound in enumerate(buckets):
+                if secs <= bound:
+                    value["buckets"][i] += 1
+                    break
+
+            value["count"] += 1
+            value["sum"] += secs
+            value["max"] = max(value["max"], secs)
+
+        result = True
+    except Exception as e:
+        logger.warning(f"Observe error: {e}", exc_info=True)
+
+    return result
+
+
+def update_site(name: str, site: str, wait: float, hold: float) -> bool:
+    # Update the wait and hold time of the lock's call site
+    result = False
+
+    try:
+        if not glovar.metrics:
+            return False
+
+        key = (name, site)
+
+        with metrics_lock:
+            value = lock_sites.get(key)
+
+            if value is None:
+                value = lock_sites[key] = {
+                    "count": 0,
+                    "hold": 0.0,
+                    "hold_max": 0.0,
+                    "wait": 0.0,
+                    "wait_max": 0.0
+                }
+
+            value["count"] += 1
+            value["hold"] += hold
+            value["hold_max"] = max(value["hold_max"], hold)
+            value["wait"] += wait
+            value["wait_max"] = max(value["wait_max"], wait)
+
+        result = True
+    except Exception as e:
+        logger.warning(f"Update site error: {e}", exc_info=True)
+
+    return result
+
+
+def update_regex_cost(word_type: str, word: str, secs: float) -> bool:
+    # Update the sampled cost of the rule, flag it if it exceeds the time budget
+    result = False
+
+    try:
+        with metrics_lock:
+            value = regex_costs.setdefault(word_type, {}).get(word)
+
+            if value is None:
+                value = regex_costs[word_type][word] = {
+                    "count": 0,
+                    "total": 0.0,
+                    "max": 0.0,
+                    "slow": False
+                }
+
+            value["count"] += 1
+            value["total"] += secs
+            value["max"] = max(value["max"], secs)
+
+            flag = not value["slow"] and secs * 1000 > glovar.regex_budget
+            value["slow"] = value["slow"] or flag
+
+        flag and logger.warning(f"Slow {word_type} rule took {secs * 1000:.0f}ms: {word}")
+
+        result = True
+    except Exception as e:
+        logger.warning(f"Update regex cost error: {e}", exc_info=True)
+
+    return result
+
+
+def reset_regex_costs(word_type: str, words: Iterable[str] = None) -> bool:
+    # Reset the sampled costs of the word type, or only the given rules
+    result = False
+
+    try:
+        with metrics_lock:
+            if words is None:
+                regex_costs.pop(word_type, None)
+            else:
+                for word in words:
+                    regex_costs.get(word_type, {}).pop(word, None)
+
+        result = True
+    except Exception as e:
+        logger.warning(f"Reset regex costs error: {e}", exc_info=True)
+
+    return result
+
+
+def start_metrics() -> Optional[ThreadingHTTPServer]:
+    # Meter the locks and start the metrics endpoint, should be called before the client starts
+    result = None
+
+    try:
+        if not glovar.metrics:
+            return None
+
+        for name in list(glovar.locks):
+            if not isinstance(glovar.locks[name], MeteredLock):
+                glovar.locks[name] = MeteredLock(name, glovar.locks[name])
+
+        if not glovar.metrics_port:
+            return None
+
+        server = ThreadingHTTPServer((glovar.metrics_host, glovar.metrics_port), MetricsHandler)
+        server.daemon_threads = True
+        Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+
+        result = server
+    except Exception as e:
+        logger.warning(f"Start metrics error: {e}", exc_info=True)
+
+    return result
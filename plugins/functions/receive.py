@@ -20,18 +20,22 @@ import logging
 import pickle
 from copy import deepcopy
 from json import loads
-from typing import Any
+from typing import Any, Set
 
 from pyrogram import Client, InlineKeyboardButton, InlineKeyboardMarkup, Message
 
 from .. import glovar
+from ..snapshot import decompress_data
 from .channel import get_debug_text, share_data
-from .etc import code, crypt_str, general_link, get_int, get_text, lang, mention_id, thread
-from .file import crypt_file, data_to_file, delete_file, get_new_path, get_downloaded_path, save
+from .crypto import crypt_data, crypt_str, decrypt_strs
+from .dispatch import dispatch
+from .etc import code, general_link, get_int, get_text, lang, mention_id, thread
+from .file import data_to_file, delete_file, get_downloaded_path, save
 from .group import get_config_text, get_member, leave_group
-from .ids import init_group_id, init_user_id
+from .ids import add_declared_message_id, add_watch_id, init_group_id, init_user_id, set_watch_ids
+from .metrics import reset_regex_costs
 from .telegram import send_message, send_report_message
-from .timers import update_admins
+from .timers import send_count, update_admins
 from .tip import tip_welcome
 
 # Enable logging
@@ -58,6 +62,43 @@ def receive_add_bad(data: dict) -> bool:
     return False
 
 
+def receive_batch(project: str, data: list, types: Set[str] = None) -> bool:
+    # Receive a batch of update events, apply them with one save
+    try:
+        # Basic data
+        project = project.lower()
+        types = types or {"declare", "score"}
+        scored = False
+
+        for event in data:
+            the_type = event["type"]
+            the_data = event["data"]
+
+            if the_type not in types:
+                continue
+
+            if the_type == "declare":
+                receive_declared_message(the_data)
+            elif the_type == "score":
+                uid = the_data["id"]
+
+                with glovar.locks["message"]:
+                    if not init_user_id(uid):
+                        continue
+
+                    glovar.user_ids[uid]["score"][project] = the_data["score"]
+
+                scored = True
+
+        scored and save("user_ids")
+
+        return True
+    except Exception as e:
+        logger.warning(f"Receive batch error: {e}", exc_info=True)
+
+    return False
+
+
 def receive_captcha_flood(data: dict) -> bool:
     # Receive captcha flood status
     result = False
@@ -140,12 +181,22 @@ def receive_clear_data(client: Client, data_type: str, data: dict) -> bool:
 
             save("user_ids")
 
+        # Clear the quarantined regex rules of a word type, or all of them
+        if data_type == "quarantine":
+            if the_type == "all":
+                glovar.regex_quarantine = {}
+            else:
+                glovar.regex_quarantine.pop(the_type, None)
+
+            glovar.regex_version += 1
+            save("regex_quarantine")
+
         # Send debug message
         text = (f"{lang('project')}{lang('colon')}{general_link(glovar.project_name, glovar.project_link)}\n"
                 f"{lang('admin_project')}{lang('colon')}{mention_id(aid)}\n"
                 f"{lang('action')}{lang('colon')}{code(lang('clear'))}\n"
                 f"{lang('more')}{lang('colon')}{code(f'{data_type} {the_type}')}\n")
-        thread(send_message, (client, glovar.debug_channel_id, text))
+        dispatch("debug", send_message, (client, glovar.debug_channel_id, text))
     except Exception as e:
         logger.warning(f"Receive clear data: {e}", exc_info=True)
     finally:
@@ -219,7 +270,7 @@ def receive_config_reply(client: Client, data: dict) -> bool:
                 ]
             ]
         )
-        thread(send_report_message, (180, client, gid, text, None, markup))
+        dispatch("tip", send_report_message, (180, client, gid, text, None, markup))
 
         return True
     except Exception as e:
@@ -248,7 +299,7 @@ def receive_config_show(client: Client, data: dict) -> bool:
                        f"{lang('reason')}{lang('colon')}{code(lang('reason_none'))}\n")
 
         # Send the text data
-        file = data_to_file(result)
+        file = data_to_file(result, True)
         share_data(
             client=client,
             receivers=["MANAGE"],
@@ -259,7 +310,8 @@ def receive_config_show(client: Client, data: dict) -> bool:
                 "message_id": mid,
                 "group_id": gid
             },
-            file=file
+            file=file,
+            encrypt=False
         )
 
         return True
@@ -269,6 +321,19 @@ def receive_config_show(client: Client, data: dict) -> bool:
     return False
 
 
+def receive_count_request(client: Client, data: str) -> bool:
+    # Receive regex count request
+    try:
+        if data != "ask":
+            return True
+
+        return send_count(client)
+    except Exception as e:
+        logger.warning(f"Receive count request error: {e}", exc_info=True)
+
+    return False
+
+
 def receive_declared_message(data: dict) -> bool:
     # Update declared message's id
     try:
@@ -280,7 +345,7 @@ def receive_declared_message(data: dict) -> bool:
             return True
 
         if init_group_id(gid):
-            glovar.declared_message_ids[gid].add(mid)
+            add_declared_message_id(gid, mid)
 
         return True
     except Exception as e:
@@ -303,21 +368,16 @@ def receive_file_data(client: Client, message: Message, decrypt: bool = True) ->
         if not path:
             return None
 
-        if decrypt:
-            # Decrypt the file, save to the tmp directory
-            path_decrypted = get_new_path()
-            crypt_file("decrypt", path, path_decrypted)
-            path_final = path_decrypted
-        else:
-            # Read the file directly
-            path_decrypted = ""
-            path_final = path
+        with open(path, "rb") as f:
+            raw = f.read()
 
-        with open(path_final, "rb") as f:
-            data = pickle.load(f)
+        thread(delete_file, (path,))
+
+        if decrypt:
+            # Decrypt the file in memory
+            raw = crypt_data("decrypt", raw)
 
-        for f in {path, path_decrypted}:
-            thread(delete_file, (f,))
+        data = pickle.loads(decompress_data(raw))
     except Exception as e:
         logger.warning(f"Receive file error: {e}", exc_info=True)
 
@@ -347,7 +407,7 @@ def receive_leave_approve(client: Client, data: dict) -> bool:
             text += f"{lang('reason')}{lang('colon')}{code(reason)}\n"
 
         leave_group(client, the_id)
-        thread(send_message, (client, glovar.debug_channel_id, text))
+        dispatch("debug", send_message, (client, glovar.debug_channel_id, text))
 
         return True
     except Exception as e:
@@ -369,7 +429,7 @@ def receive_refresh(client: Client, data: int) -> bool:
         text = (f"{lang('project')}{lang('colon')}{general_link(glovar.project_name, glovar.project_link)}\n"
                 f"{lang('admin_project')}{lang('colon')}{mention_id(aid)}\n"
                 f"{lang('action')}{lang('colon')}{code(lang('refresh'))}\n")
-        thread(send_message, (client, glovar.debug_channel_id, text))
+        dispatch("debug", send_message, (client, glovar.debug_channel_id, text))
 
         return True
     except Exception as e:
@@ -380,7 +440,6 @@ def receive_refresh(client: Client, data: int) -> bool:
 
 def receive_regex(client: Client, message: Message, data: str) -> bool:
     # Receive regex
-    glovar.locks["regex"].acquire()
     try:
         file_name = data
         word_type = file_name.split("_")[0]
@@ -388,47 +447,57 @@ def receive_regex(client: Client, message: Message, data: str) -> bool:
         if word_type not in glovar.regex:
             return True
 
+        # Download and decrypt without holding the lock
         words_data = receive_file_data(client, message)
 
         if not words_data:
             return True
 
-        pop_set = set(eval(f"glovar.{file_name}")) - set(words_data)
-        new_set = set(words_data) - set(eval(f"glovar.{file_name}"))
+        # Regenerate special characters dictionary if possible
+        special_dict = {}
 
-        for word in pop_set:
-            eval(f"glovar.{file_name}").pop(word, 0)
+        for rule in words_data:
+            if file_name not in {"spc_words", "spe_words"}:
+                break
 
-        for word in new_set:
-            eval(f"glovar.{file_name}")[word] = 0
+            # Check keys
+            if "[" not in rule:
+                continue
 
-        save(file_name)
+            # Check value
+            if "?#" not in rule:
+                continue
 
-        # Regenerate special characters dictionary if possible
-        if file_name in {"spc_words", "spe_words"}:
-            special = file_name.split("_")[0]
-            exec(f"glovar.{special}_dict = {{}}")
+            keys = rule.split("]")[0][1:]
+            value = rule.split("?#")[1][1]
+
+            for k in keys:
+                special_dict[k] = value
 
-            for rule in words_data:
-                # Check keys
-                if "[" not in rule:
-                    continue
+        # Apply the update atomically
+        with glovar.locks["regex"]:
+            pop_set = set(eval(f"glovar.{file_name}")) - set(words_data)
+            new_set = set(words_data) - set(eval(f"glovar.{file_name}"))
 
-                # Check value
-                if "?#" not in rule:
-                    continue
+            for word in pop_set:
+                eval(f"glovar.{file_name}").pop(word, 0)
 
-                keys = rule.split("]")[0][1:]
-                value = rule.split("?#")[1][1]
+            reset_regex_costs(word_type, pop_set)
 
-                for k in keys:
-                    eval(f"glovar.{special}_dict")[k] = value
+            for word in new_set:
+                eval(f"glovar.{file_name}")[word] = 0
+
+            save(file_name)
+
+            if file_name in {"spc_words", "spe_words"}:
+                setattr(glovar, f"{word_type}_dict", special_dict)
+
+            # Let the process pool fork new workers with the new rules
+            glovar.regex_version += 1
 
         return True
     except Exception as e:
         logger.warning(f"Receive regex error: {e}", exc_info=True)
-    finally:
-        glovar.locks["regex"].release()
 
     return False
 
@@ -504,20 +573,28 @@ def receive_rollback(client: Client, message: Message, data: dict) -> bool:
         # Basic data
         aid = data["admin_id"]
         the_type = data["type"]
+
+        # Download and decrypt without holding the lock
         the_data = receive_file_data(client, message)
 
         if not the_data:
             return True
 
-        exec(f"glovar.{the_type} = the_data")
-        save(the_type)
+        # Apply the data atomically
+        with glovar.locks["receive"]:
+            if the_type == "watch_ids":
+                set_watch_ids(the_data)
+            else:
+                exec(f"glovar.{the_type} = the_data")
+
+            save(the_type)
 
         # Send debug message
         text = (f"{lang('project')}{lang('colon')}{general_link(glovar.project_name, glovar.project_link)}\n"
                 f"{lang('admin_project')}{lang('colon')}{mention_id(aid)}\n"
                 f"{lang('action')}{lang('colon')}{code(lang('rollback'))}\n"
                 f"{lang('more')}{lang('colon')}{code(the_type)}\n")
-        thread(send_message, (client, glovar.debug_channel_id, text))
+        dispatch("debug", send_message, (client, glovar.debug_channel_id, text))
     except Exception as e:
         logger.warning(f"Receive rollback error: {e}", exc_info=True)
 
@@ -534,6 +611,20 @@ def receive_text_data(message: Message) -> dict:
             return {}
 
         data = loads(text)
+
+        # Expand the compact format
+        if data.get("v") and "f" in data:
+            data = {
+                "from": data["f"],
+                "to": data["t"],
+                "action": data["a"],
+                "type": data["y"],
+                "data": data["d"],
+                "v": data["v"]
+            }
+
+        # Remember the sender's wire version, a message without the version resets it
+        glovar.wire_versions[data["from"]] = data.get("v", 0)
     except Exception as e:
         logger.warning(f"Receive text data error: {e}")
 
@@ -577,13 +668,11 @@ def receive_watch_user(data: dict) -> bool:
         until = get_int(until)
 
         # Add to list
-        if the_type == "ban":
-            glovar.watch_ids["ban"][uid] = until
-        elif the_type == "delete":
-            glovar.watch_ids["delete"][uid] = until
-        else:
+        if the_type not in {"ban", "delete"}:
             return False
 
+        add_watch_id(the_type, uid, until)
+
         save("watch_ids")
 
         return True
@@ -591,3 +680,31 @@ def receive_watch_user(data: dict) -> bool:
         logger.warning(f"Receive watch user error: {e}", exc_info=True)
 
     return False
+
+
+def receive_watch_users(data: list) -> bool:
+    # Receive a batch of watch users, decrypt them together and apply them with one save
+    try:
+        # Basic data
+        events = [event["data"] for event in data if event["type"] == "watch"]
+
+        if not events:
+            return True
+
+        # Decrypt the data
+        untils = decrypt_strs([event["until"] for event in events], glovar.key)
+
+        # Add to list
+        for event, until in zip(events, untils):
+            if event["type"] not in {"ban", "delete"} or not until:
+                continue
+
+            add_watch_id(event["type"], event["id"], get_int(until))
+
+        save("watch_ids")
+
+        return True
+    except Exception as e:
+        logger.warning(f"Receive watch users error: {e}", exc_info=True)
+
+    return False
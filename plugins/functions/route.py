@@ -0,0 +1,229 @@
+# SCP-079-TIP - Here's a tip
+# Copyright (C) 2019-2020 SCP-079 <https://scp-079.org>
+#
+# This file is part of SCP-079-TIP.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+from functools import partial
+from queue import Queue
+from threading import Lock, Thread
+from time import perf_counter
+from typing import Callable, Dict, List, Tuple, Union
+
+from pyrogram import Client, Message
+
+from .. import glovar
+from .etc import thread
+from .metrics import observe
+from .receive import receive_add_bad, receive_batch, receive_captcha_flood, receive_clear_data
+from .receive import receive_config_commit, receive_config_reply, receive_config_show, receive_count_request
+from .receive import receive_declared_message, receive_help_welcome, receive_leave_approve, receive_refresh
+from .receive import receive_regex, receive_remove_bad, receive_remove_score, receive_remove_watch
+from .receive import receive_rollback, receive_user_score, receive_watch_user, receive_watch_users
+from .timers import backup_files
+
+# Enable logging
+logger = logging.getLogger(__name__)
+
+# Route policies:
+# "serial" runs under the receive lock,
+# "concurrent" runs in the handler's thread directly, the function should hold its own locks,
+# "thread" runs in a new thread,
+# "background" is queued to the background worker, for slow routes that download files or call many APIs
+# The score updates are serial, so they never interleave with a rollback
+# A type of "*" matches any type of the sender's action
+
+# This will look awkward,
+# seems like it can be simplified,
+# but this is to ensure that the permissions are clear,
+# so it is intentionally written like this
+routes: Dict[Tuple[str, str, str], Tuple[Callable, Tuple[str, ...], str]] = {
+    # CAPTCHA
+    ("CAPTCHA", "captcha", "flood"): (receive_captcha_flood, ("data",), "serial"),
+    ("CAPTCHA", "help", "welcome"): (receive_help_welcome, ("client", "data"), "concurrent"),
+    ("CAPTCHA", "update", "batch"): (receive_batch, ("sender", "data"), "serial"),
+    ("CAPTCHA", "update", "declare"): (receive_declared_message, ("data",), "concurrent"),
+    ("CAPTCHA", "update", "score"): (receive_user_score, ("sender", "data"), "serial"),
+
+    # CLEAN
+    ("CLEAN", "add", "bad"): (receive_add_bad, ("data",), "serial"),
+    ("CLEAN", "add", "batch"): (receive_watch_users, ("data",), "serial"),
+    ("CLEAN", "add", "watch"): (receive_watch_user, ("data",), "serial"),
+    ("CLEAN", "update", "batch"): (receive_batch, ("sender", "data"), "serial"),
+    ("CLEAN", "update", "declare"): (receive_declared_message, ("data",), "concurrent"),
+    ("CLEAN", "update", "score"): (receive_user_score, ("sender", "data"), "serial"),
+
+    # CONFIG
+    ("CONFIG", "config", "commit"): (receive_config_commit, ("data",), "serial"),
+    ("CONFIG", "config", "reply"): (receive_config_reply, ("client", "data"), "concurrent"),
+
+    # LANG
+    ("LANG", "add", "bad"): (receive_add_bad, ("data",), "serial"),
+    ("LANG", "add", "batch"): (receive_watch_users, ("data",), "serial"),
+    ("LANG", "add", "watch"): (receive_watch_user, ("data",), "serial"),
+    ("LANG", "update", "batch"): (receive_batch, ("sender", "data"), "serial"),
+    ("LANG", "update", "declare"): (receive_declared_message, ("data",), "concurrent"),
+    ("LANG", "update", "score"): (receive_user_score, ("sender", "data"), "serial"),
+
+    # LONG
+    ("LONG", "add", "bad"): (receive_add_bad, ("data",), "serial"),
+    ("LONG", "add", "batch"): (receive_watch_users, ("data",), "serial"),
+    ("LONG", "add", "watch"): (receive_watch_user, ("data",), "serial"),
+    ("LONG", "update", "batch"): (receive_batch, ("sender", "data"), "serial"),
+    ("LONG", "update", "declare"): (receive_declared_message, ("data",), "concurrent"),
+    ("LONG", "update", "score"): (receive_user_score, ("sender", "data"), "serial"),
+
+    # MANAGE
+    ("MANAGE", "add", "bad"): (receive_add_bad, ("data",), "serial"),
+    ("MANAGE", "backup", "now"): (backup_files, ("client",), "thread"),
+    ("MANAGE", "backup", "rollback"): (receive_rollback, ("client", "message", "data"), "background"),
+    ("MANAGE", "clear", "*"): (receive_clear_data, ("client", "type", "data"), "concurrent"),
+    ("MANAGE", "config", "show"): (receive_config_show, ("client", "data"), "concurrent"),
+    ("MANAGE", "leave", "approve"): (receive_leave_approve, ("client", "data"), "serial"),
+    ("MANAGE", "remove", "bad"): (receive_remove_bad, ("data",), "serial"),
+    ("MANAGE", "remove", "score"): (receive_remove_score, ("data",), "serial"),
+    ("MANAGE", "remove", "watch"): (receive_remove_watch, ("data",), "serial"),
+    ("MANAGE", "update", "refresh"): (receive_refresh, ("client", "data"), "background"),
+
+    # NOFLOOD
+    ("NOFLOOD", "add", "bad"): (receive_add_bad, ("data",), "serial"),
+    ("NOFLOOD", "add", "batch"): (receive_watch_users, ("data",), "serial"),
+    ("NOFLOOD", "add", "watch"): (receive_watch_user, ("data",), "serial"),
+    ("NOFLOOD", "update", "batch"): (receive_batch, ("sender", "data"), "serial"),
+    ("NOFLOOD", "update", "declare"): (receive_declared_message, ("data",), "concurrent"),
+    ("NOFLOOD", "update", "score"): (receive_user_score, ("sender", "data"), "serial"),
+
+    # NOPORN
+    ("NOPORN", "add", "bad"): (receive_add_bad, ("data",), "serial"),
+    ("NOPORN", "add", "batch"): (receive_watch_users, ("data",), "serial"),
+    ("NOPORN", "add", "watch"): (receive_watch_user, ("data",), "serial"),
+    ("NOPORN", "update", "batch"): (receive_batch, ("sender", "data"), "serial"),
+    ("NOPORN", "update", "declare"): (receive_declared_message, ("data",), "concurrent"),
+    ("NOPORN", "update", "score"): (receive_user_score, ("sender", "data"), "serial"),
+
+    # NOSPAM
+    ("NOSPAM", "add", "bad"): (receive_add_bad, ("data",), "serial"),
+    ("NOSPAM", "add", "batch"): (receive_watch_users, ("data",), "serial"),
+    ("NOSPAM", "add", "watch"): (receive_watch_user, ("data",), "serial"),
+    ("NOSPAM", "update", "batch"): (receive_batch, ("sender", "data"), "serial"),
+    ("NOSPAM", "update", "declare"): (receive_declared_message, ("data",), "concurrent"),
+    ("NOSPAM", "update", "score"): (receive_user_score, ("sender", "data"), "serial"),
+
+    # RECHECK
+    ("RECHECK", "add", "bad"): (receive_add_bad, ("data",), "serial"),
+    ("RECHECK", "add", "batch"): (receive_watch_users, ("data",), "serial"),
+    ("RECHECK", "add", "watch"): (receive_watch_user, ("data",), "serial"),
+    ("RECHECK", "update", "batch"): (receive_batch, ("sender", "data"), "serial"),
+    ("RECHECK", "update", "declare"): (receive_declared_message, ("data",), "concurrent"),
+    ("RECHECK", "update", "score"): (receive_user_score, ("sender", "data"), "serial"),
+
+    # REGEX
+    ("REGEX", "regex", "count"): (receive_count_request, ("client", "data"), "concurrent"),
+    ("REGEX", "regex", "update"): (receive_regex, ("client", "message", "data"), "background"),
+
+    # WARN
+    ("WARN", "update", "batch"): (partial(receive_batch, types={"score"}), ("sender", "data"), "serial"),
+    ("WARN", "update", "score"): (receive_user_score, ("sender", "data"), "serial"),
+
+    # WATCH
+    ("WATCH", "add", "batch"): (receive_watch_users, ("data",), "serial"),
+    ("WATCH", "add", "watch"): (receive_watch_user, ("data",), "serial")
+}
+
+# Background worker
+background: Queue = Queue()
+
+background_workers: List[Thread] = []
+
+background_lock = Lock()
+
+
+def queue_background(key: Tuple[str, str, str], func: Callable, args: tuple) -> bool:
+    # Queue a slow route to the background worker
+    result = False
+
+    try:
+        with background_lock:
+            if not background_workers:
+                t = Thread(target=run_background, name="background", daemon=True)
+                t.start()
+                background_workers.append(t)
+
+        background.put((key, func, args))
+
+        result = True
+    except Exception as e:
+        logger.warning(f"Queue background error: {e}", exc_info=True)
+
+    return result
+
+
+def route_data(client: Client, message: Message, sender: str, action: str, action_type: str,
+               data: Union[bool, dict, int, list, str]) -> bool:
+    # Route the exchange data to its handler
+    result = False
+
+    try:
+        key = (sender, action, action_type)
+        route = routes.get(key) or routes.get((sender, action, "*"))
+
+        if not route:
+            return True
+
+        func, spec, policy = route
+        context = {
+            "client": client,
+            "message": message,
+            "sender": sender,
+            "type": action_type,
+            "data": data
+        }
+        args = tuple(context[name] for name in spec)
+
+        if policy == "thread":
+            return thread(func, args)
+
+        if policy == "background":
+            return queue_background(key, func, args)
+
+        start = perf_counter()
+
+        if policy == "serial":
+            with glovar.locks["receive"]:
+                result = func(*args)
+        else:
+            result = func(*args)
+
+        observe("tip_route_seconds", perf_counter() - start, {"route": "/".join(key)})
+    except Exception as e:
+        logger.warning(f"Route data error: {e}", exc_info=True)
+
+    return result
+
+
+def run_background() -> None:
+    # Run the queued routes one by one
+    while True:
+        key, func, args = background.get()
+        start = perf_counter()
+
+        try:
+            func(*args)
+        except Exception as e:
+            logger.warning(f"Run background {key} error: {e}", exc_info=True)
+
+        observe("tip_route_seconds", perf_counter() - start, {"route": "/".join(key)})
+
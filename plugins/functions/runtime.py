@@ -0,0 +1,119 @@
+# SCP-079-TIP - Here's a tip
+# Copyright (C) 2019-2020 SCP-079 <https://scp-079.org>
+#
+# This file is part of SCP-079-TIP.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from heapq import heappop, heappush
+from itertools import count
+from threading import Condition, Lock, Thread
+from time import monotonic
+from typing import Callable, List, Optional, Tuple
+
+from .. import glovar
+
+# Enable logging
+logger = logging.getLogger(__name__)
+
+# Init the runtime lock
+runtime_lock = Lock()
+
+# Delayed calls ordered by the due time, the counter keeps the order of the calls due at the same time
+timers: List[Tuple[float, int, Callable, list]] = []
+
+timer_condition = Condition()
+
+timer_count = count()
+
+
+def call_later(secs: float, target: Callable, args: list = None) -> bool:
+    # Call a function in the timer executor with delay, away from the blocking work
+    result = False
+
+    try:
+        if not get_executor():
+            return False
+
+        with timer_condition:
+            heappush(timers, (monotonic() + secs, next(timer_count), target, args or []))
+            timer_condition.notify()
+
+        result = True
+    except Exception as e:
+        logger.warning(f"Call later error: {e}", exc_info=True)
+
+    return result
+
+
+def call_soon(target: Callable, args: tuple, kwargs: dict = None) -> bool:
+    # Call a function in the executor
+    result = False
+
+    try:
+        executor = get_executor()
+
+        if not executor:
+            return False
+
+        kwargs = kwargs or {}
+        result = bool(executor.submit(target, *args, **kwargs))
+    except Exception as e:
+        logger.warning(f"Call soon error: {e}", exc_info=True)
+
+    return result
+
+
+def get_executor() -> Optional[ThreadPoolExecutor]:
+    # Get the bounded executor, start it and the timer thread on first use
+    result = None
+
+    try:
+        if not glovar.thread_pool:
+            return None
+
+        if glovar.executor:
+            return glovar.executor
+
+        with runtime_lock:
+            if glovar.executor:
+                return glovar.executor
+
+            # The blocking work and the delayed calls use separate executors
+            glovar.timer_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="timer")
+            Thread(target=run_timers, name="timers", daemon=True).start()
+            glovar.executor = ThreadPoolExecutor(max_workers=glovar.workers, thread_name_prefix="worker")
+
+        result = glovar.executor
+    except Exception as e:
+        logger.warning(f"Get executor error: {e}", exc_info=True)
+
+    return result
+
+
+def run_timers() -> None:
+    # Submit the due delayed calls to the timer executor
+    while True:
+        with timer_condition:
+            while not timers or timers[0][0] > monotonic():
+                timer_condition.wait(timers[0][0] - monotonic() if timers else None)
+
+            _, _, target, args = heappop(timers)
+
+        try:
+            glovar.timer_executor.submit(target, *args)
+        except Exception as e:
+            logger.warning(f"Run timers error: {e}", exc_info=True)
@@ -17,7 +17,8 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import logging
-from typing import Iterable, List, Optional, Union
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Union
 
 from pyrogram import Chat, ChatMember, ChatPreview, Client
 from pyrogram import InlineKeyboardMarkup, Message
@@ -29,11 +30,14 @@ from pyrogram.errors import UsernameInvalid, UsernameNotOccupied, UserNotPartici
 
 from .. import glovar
 from .decorators import retry
-from .etc import delay, wait_flood
+from .etc import delay, get_now, wait_flood
 
 # Enable logging
 logger = logging.getLogger(__name__)
 
+# Init the prefetcher of full users
+prefetcher = ThreadPoolExecutor(max_workers=glovar.prefetch, thread_name_prefix="prefetch")
+
 
 def answer_callback(client: Client, callback_query_id: str, text: str, show_alert: bool = False) -> Optional[bool]:
     # Answer the callback
@@ -274,6 +278,41 @@ def get_user_full(client: Client, uid: int) -> Optional[UserFull]:
     return result
 
 
+def get_user_bios(client: Client, uids: List[int]) -> Dict[int, str]:
+    # Get users' bios, from the cache or fetch the missed ones at the same time
+    result = {}
+
+    try:
+        now = get_now()
+        missed = []
+
+        for uid in uids:
+            cache = glovar.bios.get(uid)
+
+            if cache and now - cache[0] < glovar.time_bio:
+                result[uid] = cache[1]
+            else:
+                missed.append(uid)
+
+        if len(missed) > 1:
+            users = list(prefetcher.map(lambda x: get_user_full(client, x), missed))
+        else:
+            users = [get_user_full(client, uid) for uid in missed]
+
+        for uid, user in zip(missed, users):
+            # Failed lookups are not cached
+            if not user:
+                result[uid] = ""
+                continue
+
+            result[uid] = user.about or ""
+            glovar.bios[uid] = (now, result[uid])
+    except Exception as e:
+        logger.warning(f"Get user bios error: {e}", exc_info=True)
+
+    return result
+
+
 def leave_chat(client: Client, cid: int, delete: bool = False) -> bool:
     # Leave a channel
     try:
@@ -18,15 +18,17 @@
 
 import logging
 from subprocess import run
-from time import sleep
 
 from pyrogram import Client
 
 from .. import glovar
-from .channel import share_data, share_regex_count
-from .etc import code, general_link, get_now, get_readable_time, lang, thread
+from .channel import share_backup, share_data, share_regex_count
+from .dispatch import dispatch
+from .etc import code, code_block, general_link, get_digest, get_now, get_readable_time, lang, thread
 from .file import move_file, save
 from .group import delete_message, leave_group
+from .ids import purge_watch_ids, set_watch_ids
+from .metrics import get_locks, get_summary, reset_regex_costs
 from .telegram import get_admins, get_group_info, send_message
 from .tip import get_invite_link
 
@@ -35,23 +37,21 @@ logger = logging.getLogger(__name__)
 
 
 def backup_files(client: Client) -> bool:
-    # Backup data files to BACKUP
+    # Backup the changed data files to BACKUP
     try:
         for file in glovar.file_list:
             # Check
-            if not eval(f"glovar.{file}"):
+            if file == "backup_hashes" or not eval(f"glovar.{file}"):
+                continue
+
+            # Compare with the last backup
+            digest = get_digest(eval(f"glovar.{file}"))
+
+            if glovar.backup_hashes.get(file) == digest:
                 continue
 
             # Share
-            share_data(
-                client=client,
-                receivers=["BACKUP"],
-                action="backup",
-                action_type="data",
-                data=file,
-                file=f"data/{file}"
-            )
-            sleep(5)
+            share_backup(client, file, digest)
 
         return True
     except Exception as e:
@@ -87,6 +87,17 @@ def interval_min_01(client: Client) -> bool:
 
         save("message_ids")
 
+        # Remove the expired watch users
+        purge_watch_ids(now) and save("watch_ids")
+
+        # Report the quarantined rules
+        glovar.regex_quarantined and send_quarantined(client)
+
+        # Clear the expired bios
+        for uid in list(glovar.bios):
+            if now - glovar.bios[uid][0] >= glovar.time_bio:
+                glovar.bios.pop(uid, None)
+
         # Generate a new invite link
         for gid in list(glovar.configs):
             if not glovar.configs[gid].get("channel"):
@@ -164,16 +175,16 @@ def reset_data(client: Client) -> bool:
         glovar.user_ids = {}
         save("user_ids")
 
-        glovar.watch_ids = {
+        set_watch_ids({
             "ban": {},
             "delete": {}
-        }
+        })
         save("watch_ids")
 
         # Send debug message
         text = (f"{lang('project')}{lang('colon')}{general_link(glovar.project_name, glovar.project_link)}\n"
                 f"{lang('action')}{lang('colon')}{code(lang('reset'))}\n")
-        thread(send_message, (client, glovar.debug_channel_id, text))
+        dispatch("debug", send_message, (client, glovar.debug_channel_id, text))
 
         return True
     except Exception as e:
@@ -184,12 +195,60 @@ def reset_data(client: Client) -> bool:
     return False
 
 
+def send_metrics(client: Client) -> bool:
+    # Send the metrics summary to the debug channel
+    result = False
+
+    try:
+        summary = get_summary()
+        locks = get_locks(5)
+
+        if not summary:
+            return False
+
+        text = (f"{lang('project')}{lang('colon')}{general_link(glovar.project_name, glovar.project_link)}\n"
+                f"{lang('action')}{lang('colon')}{code(lang('metrics'))}\n"
+                f"{code_block(summary.strip())}\n")
+
+        if locks:
+            text += f"{code_block(locks.strip())}\n"
+
+        result = dispatch("debug", send_message, (client, glovar.debug_channel_id, text))
+    except Exception as e:
+        logger.warning(f"Send metrics error: {e}", exc_info=True)
+
+    return result
+
+
+def send_quarantined(client: Client) -> bool:
+    # Send the rules quarantined since the last notice to the debug channel
+    result = False
+
+    try:
+        rules, glovar.regex_quarantined = glovar.regex_quarantined, []
+
+        if not rules:
+            return False
+
+        detail = "\n".join(f"{word_type} {word}" for word_type, word in rules)
+        text = (f"{lang('project')}{lang('colon')}{general_link(glovar.project_name, glovar.project_link)}\n"
+                f"{lang('action')}{lang('colon')}{code(lang('regex_quarantine'))}\n"
+                f"{lang('more')}{lang('colon')}{code(f'{glovar.regex_timeout}ms')}\n"
+                f"{code_block(detail)}\n")
+        result = dispatch("debug", send_message, (client, glovar.debug_channel_id, text))
+    except Exception as e:
+        logger.warning(f"Send quarantined error: {e}", exc_info=True)
+
+    return result
+
+
 def send_count(client: Client) -> bool:
     # Send regex count to REGEX
     glovar.locks["regex"].acquire()
     try:
         for word_type in glovar.regex:
             share_regex_count(client, word_type)
+            reset_regex_costs(word_type)
             word_list = list(eval(f"glovar.{word_type}_words"))
 
             for word in word_list:
@@ -273,7 +332,7 @@ def update_admins(client: Client) -> bool:
                               f"{lang('group_name')}{lang('colon')}{general_link(group_name, group_link)}\n"
                               f"{lang('group_id')}{lang('colon')}{code(gid)}\n"
                               f"{lang('status')}{lang('colon')}{code(reason)}\n")
-                thread(send_message, (client, glovar.debug_channel_id, debug_text))
+                dispatch("debug", send_message, (client, glovar.debug_channel_id, debug_text))
             elif admin_members is False or any([admin.user.is_self for admin in admin_members]) is False:
                 # Bot is not in the chat, leave automatically without approve
                 group_name, group_link = get_group_info(client, gid)
@@ -295,7 +354,7 @@ def update_admins(client: Client) -> bool:
                               f"{lang('group_id')}{lang('colon')}{code(gid)}\n"
                               f"{lang('status')}{lang('colon')}{code(lang('leave_auto'))}\n"
                               f"{lang('reason')}{lang('colon')}{code(lang('reason_leave'))}\n")
-                thread(send_message, (client, glovar.debug_channel_id, debug_text))
+                dispatch("debug", send_message, (client, glovar.debug_channel_id, debug_text))
 
         return True
     except Exception as e:
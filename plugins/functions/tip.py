@@ -17,12 +17,13 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import logging
-from typing import List, Optional
+import re
+from typing import Callable, Dict, List, Optional, Tuple
 
-from pyrogram import ChatMember, Client, InlineKeyboardButton, InlineKeyboardMarkup, Message
+from pyrogram import ChatMember, Client, InlineKeyboardButton, InlineKeyboardMarkup, Message, User
 
 from .. import glovar
-from .etc import code, get_full_name, get_length, get_now, lang, mention_id, mention_name
+from .etc import code, delay, get_full_name, get_length, get_now, lang, mention_id, mention_name
 from .file import save
 from .group import delete_message
 from .telegram import edit_message_text, export_chat_invite_link, send_message
@@ -31,6 +32,43 @@ from .telegram import edit_message_text, export_chat_invite_link, send_message
 # Enable logging
 logger = logging.getLogger(__name__)
 
+# Init the placeholders of the tip texts
+placeholders: Dict[str, Callable[[User], str]] = {
+    "$code_id": lambda u: code(u.id),
+    "$code_name": lambda u: code(get_full_name(u)),
+    "$mention_id": lambda u: mention_id(u.id),
+    "$mention_name": mention_name
+}
+
+placeholder_pattern = re.compile("(" + "|".join(re.escape(p) for p in placeholders) + ")")
+
+
+def add_welcome(client: Client, gid: int, users: List[User], mid: int, secs: int = 0) -> bool:
+    # Add the joined users to the group's welcome batch, the first users schedule the welcome
+    result = False
+
+    glovar.locks["welcome"].acquire()
+
+    try:
+        batch = glovar.welcome_batches.get(gid)
+
+        if batch:
+            batch["users"] += [u for u in users if all(b.id != u.id for b in batch["users"])]
+            batch["mid"] = mid
+            return True
+
+        glovar.welcome_batches[gid] = {
+            "mid": mid,
+            "users": list(users)
+        }
+        result = delay(secs or glovar.time_welcome_batch, tip_welcome_batch, [client, gid])
+    except Exception as e:
+        logger.warning(f"Add welcome error: {e}", exc_info=True)
+    finally:
+        glovar.locks["welcome"].release()
+
+    return result
+
 
 def get_invite_link(client: Client, the_type: str, gid: int, manual: bool = False, reason: str = "") -> bool:
     # Get a new invite link
@@ -214,6 +252,72 @@ def get_markup(the_type: str, gid: int) -> Optional[InlineKeyboardMarkup]:
     return result
 
 
+def send_welcome(client: Client, gid: int, users: List[User], mid: int = None) -> bool:
+    # Send a welcome message to the users, replace the previous one
+    try:
+        # Basic data
+        now = get_now()
+
+        # Get the template
+        segments, markup = get_template("welcome", gid)
+
+        # Check the config
+        if not segments or not users:
+            return True
+
+        if glovar.configs[gid].get("alone"):
+            mid = None
+
+        # Only mention some of the users
+        more = len(users) - glovar.welcome_mentions
+        more = more > 0 and f" +{more}" or ""
+        users = users[:glovar.welcome_mentions]
+
+        # Render
+        values = {p: " ".join(placeholders[p](u) for u in users) + more for p in set(segments) & placeholders.keys()}
+        text = "".join(values.get(s, s) for s in segments)
+
+        # Send the tip
+        result = send_message(client, gid, text, mid, markup)
+
+        if result:
+            mid, _ = glovar.message_ids[gid]["welcome"]
+            mid and delete_message(client, gid, mid)
+            glovar.message_ids[gid]["welcome"] = (result.message_id, now)
+            save("message_ids")
+
+        return True
+    except Exception as e:
+        logger.warning(f"Send welcome error: {e}", exc_info=True)
+
+    return False
+
+
+def get_template(the_type: str, gid: int) -> Tuple[List[str], Optional[InlineKeyboardMarkup]]:
+    # Get the split tip text and the markup, compile them again after the config changed
+    result = ([], None)
+
+    try:
+        config = glovar.configs[gid]
+        source = (config.get(f"{the_type}_text"), config.get(f"{the_type}_button"), config.get(f"{the_type}_link"))
+        templates = glovar.templates.setdefault(gid, {})
+        template = templates.get(the_type)
+
+        if template and template[0] == source:
+            return template[1], template[2]
+
+        # Placeholders are at the odd positions, static parts are kept as they are
+        segments = [s for s in placeholder_pattern.split(source[0] or "") if s]
+        markup = get_markup(the_type, gid)
+        templates[the_type] = (source, segments, markup)
+
+        result = (segments, markup)
+    except Exception as e:
+        logger.warning(f"Get template error: {e}", exc_info=True)
+
+    return result
+
+
 def tip_keyword(client: Client, message: Message, text: str, mid: int) -> bool:
     # Send keyword tip
     try:
@@ -261,16 +365,16 @@ def tip_ot(client: Client, gid: int, mid: int = None) -> bool:
         # Basic data
         now = get_now()
         
-        # Get the markup
-        markup = get_markup("ot", gid)
-        
+        # Get the template
+        segments, markup = get_template("ot", gid)
+
         # Read the config
-        text = glovar.configs[gid].get("ot_text")
+        text = "".join(segments)
 
         # Check the config
         if not glovar.configs[gid].get("ot") or not text:
             return True
-        
+
         # Send the tip
         result = send_message(client, gid, text, mid, markup)
 
@@ -302,7 +406,7 @@ def tip_rm(client: Client, gid: int, text: str, mid: int = None) -> bool:
             return True
 
         # Get the markup
-        markup = get_markup("rm", gid)
+        _, markup = get_template("rm", gid)
 
         # Send the tip
         result = send_message(client, gid, text, mid, markup)
@@ -321,67 +425,68 @@ def tip_rm(client: Client, gid: int, text: str, mid: int = None) -> bool:
 
 
 def tip_welcome(client: Client, message: Message = None,
-                member: ChatMember = None, gid: int = 0, mid: int = None, force: bool = False) -> bool:
-    # Send welcome tip
+                member: ChatMember = None, gid: int = 0, mid: int = None, force: bool = False,
+                secs: int = 0) -> bool:
+    # Send welcome tip, or gather the users and welcome them together after the secs
     try:
         # Basic data
         if message:
-            if message.new_chat_members:
-                user = message.new_chat_members[0]
-            else:
-                user = message.from_user
-
+            users = message.new_chat_members or [message.from_user]
             gid = message.chat.id
-            uid = user.id
             mid = message.message_id
         elif member and gid:
             if member.status not in {"member", "restricted"}:
                 return True
 
-            user = member.user
-            uid = user.id
+            users = [member.user]
         else:
             return True
 
-        name = get_full_name(user)
-        now = get_now()
+        # Gather all the joined users in batch mode, otherwise only welcome the first one
+        batch = message and not force and (secs or glovar.time_welcome_batch)
+        users = users if batch else users[:1]
 
         # Check welcome status
-        if not force and uid in glovar.welcomed_ids[gid]:
-            return True
-        else:
-            glovar.welcomed_ids[gid].add(uid)
+        if not force:
+            users = [u for u in users if u.id not in glovar.welcomed_ids[gid]]
 
-        # Get the markup
-        markup = get_markup("welcome", gid)
+        if not users:
+            return True
 
-        # Read the config
-        text = glovar.configs[gid].get("welcome_text")
+        glovar.welcomed_ids[gid].update(u.id for u in users)
 
         # Check the config
-        if not text:
+        if not glovar.configs[gid].get("welcome_text"):
             return True
 
-        if glovar.configs[gid].get("alone"):
-            mid = None
+        # Gather the users joined in a short time
+        if batch:
+            return add_welcome(client, gid, users, mid, secs)
 
-        # Replace
-        text = text.replace("$code_id", code(uid))
-        text = text.replace("$code_name", code(name))
-        text = text.replace("$mention_id", mention_id(uid))
-        text = text.replace("$mention_name", mention_name(user))
+        return send_welcome(client, gid, users, mid)
+    except Exception as e:
+        logger.warning(f"Tip welcome error: {e}", exc_info=True)
 
-        # Send the tip
-        result = send_message(client, gid, text, mid, markup)
+    return False
 
-        if result:
-            mid, _ = glovar.message_ids[gid]["welcome"]
-            mid and delete_message(client, gid, mid)
-            glovar.message_ids[gid]["welcome"] = (result.message_id, now)
-            save("message_ids")
 
-        return True
+def tip_welcome_batch(client: Client, gid: int) -> bool:
+    # Send the welcome tip to the gathered users
+    result = False
+
+    try:
+        with glovar.locks["welcome"]:
+            batch = glovar.welcome_batches.pop(gid, {})
+
+        if not batch:
+            return True
+
+        with glovar.locks["message"]:
+            if gid not in glovar.message_ids:
+                return True
+
+            result = send_welcome(client, gid, batch["users"], batch["mid"])
     except Exception as e:
-        logger.warning(f"Tip welcome error: {e}", exc_info=True)
+        logger.warning(f"Tip welcome batch error: {e}", exc_info=True)
 
-    return False
+    return result
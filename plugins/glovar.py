@@ -19,21 +19,29 @@
 import logging
 import pickle
 from codecs import getdecoder
+from concurrent.futures import ThreadPoolExecutor
 from configparser import RawConfigParser
 from os import mkdir
 from os.path import exists
 from shutil import rmtree
 from string import ascii_lowercase
-from threading import Lock
-from typing import Dict, List, Set, Tuple, Union
+from threading import Lock, RLock
+from time import perf_counter
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple, Union
 
-from emoji import UNICODE_EMOJI
-from pyrogram import Chat, ChatMember
+from pyrogram import Chat, ChatMember, InlineKeyboardMarkup, User
 from yaml import safe_load
 
 from .checker import check_all, raise_error
+from .snapshot import decompress_data, load_snapshot
 from .version import version_control
 
+# Startup profile
+startup: Dict[str, float] = {"import": perf_counter()}
+# startup = {
+#     "import": 0.0
+# }
+
 # Path variables
 CONFIG_PATH = "data/config/config.ini"
 LOG_PATH = "data/log"
@@ -112,17 +120,54 @@ password: str = ""
 lang: str = "cmn-Hans"
 normalize: Union[bool, str] = "True"
 
+# [limit]
+analysis_timeout: int = 5000
+debug_queue: int = 100
+debug_rate: int = 20
+declared_window: int = 1000
+exchange_rate: int = 20
+join_burst: int = 20
+matchers: int = 2
+prefetch: int = 8
+processes: int = 2
+regex_budget: int = 50
+regex_sample: int = 100
+regex_timeout: int = 1000
+regex_top: int = 20
+senders: int = 4
+welcome_mentions: int = 20
+workers: int = 32
+
+# [metrics]
+metrics_host: str = "127.0.0.1"
+metrics_port: int = 9079
+metrics_summary: int = 0
+
 # [mode]
 aio: Union[bool, str] = "False"
 backup: Union[bool, str] = "False"
+compact: Union[bool, str] = "False"
+compress: Union[bool, str] = "False"
+compress_exchange: Union[bool, str] = "False"
+metrics: Union[bool, str] = "False"
+offload: Union[bool, str] = "False"
+regex_cost: Union[bool, str] = "False"
+safe_regex: Union[bool, str] = "False"
+snapshot: Union[bool, str] = "False"
+snapshot_mmap: Union[bool, str] = "False"
+thread_pool: Union[bool, str] = "False"
 
 # [time]
 date_reset: str = "1st mon"
+time_bio: int = 300
 time_channel: int = 0
 time_keyword: int = 0
 time_ot: int = 0
+time_raid: int = 60
 time_rm: int = 0
+time_snapshot: int = 10
 time_welcome: int = 0
+time_welcome_batch: int = 0
 
 try:
     not exists(CONFIG_PATH) and raise_error(f"{CONFIG_PATH} does not exists")
@@ -183,19 +228,66 @@ try:
     normalize = config.get("language", "normalize", fallback=normalize)
     normalize = eval(normalize)
 
+    # [limit]
+    analysis_timeout = int(config.get("limit", "analysis_timeout", fallback=analysis_timeout))
+    debug_queue = int(config.get("limit", "debug_queue", fallback=debug_queue))
+    debug_rate = int(config.get("limit", "debug_rate", fallback=debug_rate))
+    declared_window = int(config.get("limit", "declared_window", fallback=declared_window))
+    exchange_rate = int(config.get("limit", "exchange_rate", fallback=exchange_rate))
+    join_burst = int(config.get("limit", "join_burst", fallback=join_burst))
+    matchers = int(config.get("limit", "matchers", fallback=matchers))
+    prefetch = int(config.get("limit", "prefetch", fallback=prefetch))
+    processes = int(config.get("limit", "processes", fallback=processes))
+    regex_budget = int(config.get("limit", "regex_budget", fallback=regex_budget))
+    regex_sample = int(config.get("limit", "regex_sample", fallback=regex_sample))
+    regex_timeout = int(config.get("limit", "regex_timeout", fallback=regex_timeout))
+    regex_top = int(config.get("limit", "regex_top", fallback=regex_top))
+    senders = int(config.get("limit", "senders", fallback=senders))
+    welcome_mentions = int(config.get("limit", "welcome_mentions", fallback=welcome_mentions))
+    workers = int(config.get("limit", "workers", fallback=workers))
+
+    # [metrics]
+    metrics_host = config.get("metrics", "metrics_host", fallback=metrics_host)
+    metrics_port = int(config.get("metrics", "metrics_port", fallback=metrics_port))
+    metrics_summary = int(config.get("metrics", "metrics_summary", fallback=metrics_summary))
+
     # [mode]
     aio = config.get("mode", "aio", fallback=aio)
     aio = eval(aio)
     backup = config.get("mode", "backup", fallback=backup)
     backup = eval(backup)
+    compact = config.get("mode", "compact", fallback=compact)
+    compact = eval(compact)
+    compress = config.get("mode", "compress", fallback=compress)
+    compress = eval(compress)
+    compress_exchange = config.get("mode", "compress_exchange", fallback=compress_exchange)
+    compress_exchange = eval(compress_exchange)
+    metrics = config.get("mode", "metrics", fallback=metrics)
+    metrics = eval(metrics)
+    offload = config.get("mode", "offload", fallback=offload)
+    offload = eval(offload)
+    regex_cost = config.get("mode", "regex_cost", fallback=regex_cost)
+    regex_cost = eval(regex_cost)
+    safe_regex = config.get("mode", "safe_regex", fallback=safe_regex)
+    safe_regex = eval(safe_regex)
+    snapshot = config.get("mode", "snapshot", fallback=snapshot)
+    snapshot = eval(snapshot)
+    snapshot_mmap = config.get("mode", "snapshot_mmap", fallback=snapshot_mmap)
+    snapshot_mmap = eval(snapshot_mmap)
+    thread_pool = config.get("mode", "thread_pool", fallback=thread_pool)
+    thread_pool = eval(thread_pool)
 
     # [time]
     date_reset = config.get("time", "date_reset", fallback=date_reset)
+    time_bio = int(config.get("time", "time_bio", fallback=time_bio))
     time_channel = int(config.get("time", "time_channel", fallback=time_channel))
     time_keyword = int(config.get("time", "time_keyword", fallback=time_keyword))
     time_ot = int(config.get("time", "time_ot", fallback=time_ot))
+    time_raid = int(config.get("time", "time_raid", fallback=time_raid))
     time_rm = int(config.get("time", "time_rm", fallback=time_rm))
+    time_snapshot = int(config.get("time", "time_snapshot", fallback=time_snapshot))
     time_welcome = int(config.get("time", "time_welcome", fallback=time_welcome))
+    time_welcome_batch = int(config.get("time", "time_welcome_batch", fallback=time_welcome_batch))
 
     # [flag]
     broken = False
@@ -256,22 +348,61 @@ check_all(
             "lang": lang,
             "normalize": normalize
         },
+        "limit": {
+            "analysis_timeout": analysis_timeout,
+            "debug_queue": debug_queue,
+            "debug_rate": debug_rate,
+            "declared_window": declared_window,
+            "exchange_rate": exchange_rate,
+            "join_burst": join_burst,
+            "matchers": matchers,
+            "prefetch": prefetch,
+            "processes": processes,
+            "regex_budget": regex_budget,
+            "regex_sample": regex_sample,
+            "regex_timeout": regex_timeout,
+            "regex_top": regex_top,
+            "senders": senders,
+            "welcome_mentions": welcome_mentions,
+            "workers": workers
+        },
+        "metrics": {
+            "metrics_host": metrics_host,
+            "metrics_port": metrics_port,
+            "metrics_summary": metrics_summary
+        },
         "mode": {
             "aio": aio,
-            "backup": backup
+            "backup": backup,
+            "compact": compact,
+            "compress": compress,
+            "compress_exchange": compress_exchange,
+            "metrics": metrics,
+            "offload": offload,
+            "regex_cost": regex_cost,
+            "safe_regex": safe_regex,
+            "snapshot": snapshot,
+            "snapshot_mmap": snapshot_mmap,
+            "thread_pool": thread_pool
         },
         "time": {
             "date_reset": date_reset,
+            "time_bio": time_bio,
             "time_channel": time_channel,
             "time_keyword": time_keyword,
             "time_ot": time_ot,
+            "time_raid": time_raid,
             "time_rm": time_rm,
-            "time_welcome": time_welcome
+            "time_snapshot": time_snapshot,
+            "time_welcome": time_welcome,
+            "time_welcome_batch": time_welcome_batch
         }
     },
     broken
 )
 
+startup["config"] = perf_counter()
+
 # Language Dictionary
 lang_dict: dict = {}
 
@@ -282,6 +413,8 @@ except Exception as e:
     logger.critical(f"Reading language YAML file failed: {e}", exc_info=True)
     raise SystemExit("Reading language YAML file failed")
 
+startup["language"] = perf_counter()
+
 # Init
 
 all_commands: List[str] = [
@@ -303,6 +436,11 @@ all_commands: List[str] = [
 bot_ids: Set[int] = {avatar_id, captcha_id, clean_id, index_id, lang_id, long_id,
                      noflood_id, noporn_id, nospam_id, tip_id, user_id, warn_id}
 
+bios: Dict[int, Tuple[int, str]] = {}
+# bios = {
+#     12345678: (1512345678, "bio")
+# }
+
 chats: Dict[int, Chat] = {}
 # chats = {
 #     -10012345678: Chat
@@ -313,6 +451,11 @@ declared_message_ids: Dict[int, Set[int]] = {}
 #     -10012345678: {123}
 # }
 
+declared_message_queues: Dict[int, Deque[int]] = {}
+# declared_message_queues = {
+#     -10012345678: deque([123])
+# }
+
 default_config: Dict[str, Union[bool, int, str]] = {
     "default": True,
     "lock": 0,
@@ -365,14 +508,27 @@ default_user_status: Dict[str, Dict[str, float]] = {
     }
 }
 
-emoji_set: Set[str] = set(UNICODE_EMOJI)
+emoji_set: Set[str]
+# emoji_set = {"😀"}, loaded on first use
+
+executor: Optional[ThreadPoolExecutor] = None
+
+join_times: Dict[int, Deque[int]] = {}
+# join_times = {
+#     -10012345678: deque([1512345678])
+# }
 
 locks: Dict[str, Lock] = {
     "admin": Lock(),
     "channel": Lock(),
+    "declare": Lock(),
+    "join": Lock(),
     "message": Lock(),
     "receive": Lock(),
-    "regex": Lock()
+    "regex": Lock(),
+    "snapshot": Lock(),
+    "watch": Lock(),
+    "welcome": Lock()
 }
 
 members: Dict[int, Dict[int, ChatMember]] = {}
@@ -382,6 +538,20 @@ members: Dict[int, Dict[int, ChatMember]] = {}
 #     }
 # }
 
+priorities: Dict[str, int] = {
+    "tip": 0,
+    "exchange": exchange_rate,
+    "debug": debug_rate
+}
+# priorities = {
+#     "priority": messages per minute, 0 means no limit
+# }
+
+raid_ids: Dict[int, int] = {}
+# raid_ids = {
+#     -10012345678: 1512345678
+# }
+
 regex: Dict[str, bool] = {
     "ad": False,
     "ban": False,
@@ -403,10 +573,33 @@ regex: Dict[str, bool] = {
 for c in ascii_lowercase:
     regex[f"ad{c}"] = False
 
+regex_hits: List[Tuple[str, str]] = []
+# regex_hits = [
+#     ("ad", "regex")
+# ]
+
+regex_quarantined: List[Tuple[str, str]] = []
+# regex_quarantined = [
+#     ("ad", "regex")
+# ], the rules quarantined since the last debug notice
+
+regex_version: int = 0
+
 sender: str = "TIP"
 
 should_hide: bool = False
 
+snapshot_pending: bool = False
+
+templates: Dict[int, Dict[str, Tuple[Tuple[str, str, str], List[str], Optional[InlineKeyboardMarkup]]]] = {}
+# templates = {
+#     -10012345678: {
+#         "welcome": (("text", "button", "link"), ["text"], InlineKeyboardMarkup)
+#     }
+# }
+
+timer_executor: Optional[ThreadPoolExecutor] = None
+
 keyworded_ids: Dict[int, Dict[int, Set[str]]] = {}
 # keyworded_ids = {
 #     -10012345678: {
@@ -416,11 +609,32 @@ keyworded_ids: Dict[int, Dict[int, Set[str]]] = {}
 
 version: str = "0.1.9"
 
+welcome_batches: Dict[int, Dict[str, Union[int, List[User]]]] = {}
+# welcome_batches = {
+#     -10012345678: {
+#         "mid": 123,
+#         "users": [User]
+#     }
+# }
+
 welcomed_ids: Dict[int, Set[int]] = {}
 # welcomed_ids = {
 #     -10012345678: {12345678}
 # }
 
+worker: bool = False
+
+wire_version: int = 2
+# wire_version = {
+#     1: "compact format",
+#     2: "batch envelope"
+# }
+
+wire_versions: Dict[str, int] = {}
+# wire_versions = {
+#     "CAPTCHA": 2
+# }
+
 # Load data from pickle
 
 # Init dir
@@ -506,6 +720,11 @@ watch_ids: Dict[str, Dict[int, int]] = {
 
 # Init data variables
 
+backup_hashes: Dict[str, str] = {}
+# backup_hashes = {
+#     "admin_ids": "sha256"
+# }
+
 configs: Dict[int, Dict[str, Union[bool, int, str]]] = {}
 # configs = {
 #     -10012345678: {
@@ -542,47 +761,94 @@ configs: Dict[int, Dict[str, Union[bool, int, str]]] = {}
 current: str = ""
 # current = "0.0.1"
 
+regex_quarantine: Dict[str, Set[str]] = {}
+# regex_quarantine = {
+#     "ad": {"regex"}
+# }
+
 token: str = ""
 # token = "123456:ABC-DEF1234ghIkl-zyx57W2v1u123ew11"
 
 # Init word variables
 
-for word_type in regex:
-    locals()[f"{word_type}_words"]: Dict[str, Dict[str, Union[float, int]]] = {}
-
 # type_words = {
 #     "regex": 0
-# }
+# }, loaded on first use
+
+# spc_dict = {
+#     "a": "b"
+# }, generated on first use
 
 # Load data
 file_list: List[str] = ["admin_ids", "bad_ids", "flooded_ids", "lack_group_ids", "left_group_ids", "message_ids",
                         "trust_ids", "user_ids", "watch_ids",
-                        "configs", "current", "token"]
-file_list += [f"{f}_words" for f in regex]
+                        "backup_hashes", "configs", "current", "regex_quarantine", "token"]
+
+lazy_list: List[str] = [f"{f}_words" for f in regex] + ["spc_dict", "spe_dict", "emoji_set"]
+
+lazy_lock = RLock()
+
+# Load the snapshot if it exists, the data files are only read before the first snapshot
+# After the snapshot mode is disabled, the snapshot is read once more and migrated back to the data files
+snapshot_sections: Optional[Dict[str, Union[bytes, memoryview]]] = {}
+# snapshot_sections = {
+#     "admin_ids": b"pickled"
+# }
+
+for path in [f"{PICKLE_PATH}/snapshot", f"{PICKLE_BACKUP_PATH}/snapshot"]:
+    if not exists(path):
+        continue
+
+    snapshot_sections = load_snapshot(path, snapshot_mmap)
+
+    if snapshot_sections is not None:
+        break
+
+if snapshot_sections is None:
+    raise SystemExit("[DATA CORRUPTION]")
+
+snapshot_migrate: bool = not snapshot and bool(snapshot_sections)
 
-for file in file_list:
+
+def load_data(file: str, default: Any) -> Any:
+    # Load a data file, use the backup if it is broken
     try:
         try:
+            if file in snapshot_sections:
+                return pickle.loads(decompress_data(snapshot_sections.pop(file)))
+
             if exists(f"{PICKLE_PATH}/{file}") or exists(f"{PICKLE_BACKUP_PATH}/{file}"):
                 with open(f"{PICKLE_PATH}/{file}", "rb") as f:
-                    locals()[f"{file}"] = pickle.load(f)
-            else:
-                with open(f"{PICKLE_PATH}/{file}", "wb") as f:
-                    pickle.dump(eval(f"{file}"), f)
+                    return pickle.loads(decompress_data(f.read()))
+
+            with open(f"{PICKLE_PATH}/{file}", "wb") as f:
+                pickle.dump(default, f)
+
+            return default
         except Exception as e:
             logger.error(f"Load data {file} error: {e}", exc_info=True)
 
             with open(f"{PICKLE_BACKUP_PATH}/{file}", "rb") as f:
-                locals()[f"{file}"] = pickle.load(f)
+                return pickle.loads(decompress_data(f.read()))
     except Exception as e:
         logger.critical(f"Load data {file} backup error: {e}", exc_info=True)
         raise SystemExit("[DATA CORRUPTION]")
 
-# Generate special characters dictionary
-for special in ["spc", "spe"]:
-    locals()[f"{special}_dict"]: Dict[str, str] = {}
 
-    for rule in locals()[f"{special}_words"]:
+def load_lazy(name: str) -> Any:
+    # Load a variable of the lazy list
+    if name == "emoji_set":
+        from emoji import UNICODE_EMOJI
+        return set(UNICODE_EMOJI)
+
+    if name.endswith("_words"):
+        return load_data(name, {})
+
+    # Generate special characters dictionary
+    special = name[:-len("_dict")]
+    special_dict: Dict[str, str] = {}
+
+    for rule in __getattr__(f"{special}_words"):
         # Check keys
         if "[" not in rule:
             continue
@@ -595,7 +861,37 @@ for special in ["spc", "spe"]:
         value = rule.split("?#")[1][1]
 
         for k in keys:
-            locals()[f"{special}_dict"][k] = value
+            special_dict[k] = value
+
+    return special_dict
+
+
+def __getattr__(name: str) -> Any:
+    # Load the rule tables and other large variables on first use
+    if name not in lazy_list:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    with lazy_lock:
+        if name not in globals():
+            globals()[name] = load_lazy(name)
+
+    return globals()[name]
+
+
+# The state files are needed by every handler, read them at the same time
+with ThreadPoolExecutor(max_workers=8) as loader:
+    for file, data in zip(file_list, list(loader.map(lambda x: load_data(x, globals()[x]), file_list))):
+        globals()[file] = data
+
+file_list += [f"{f}_words" for f in regex]
+
+# Index the watch users by the until time, the expired ones are purged every minute, built by init()
+watch_heap: List[Tuple[int, str, int]] = []
+# watch_heap = [
+#     (1512345678, "ban", 12345678)
+# ]
+
+startup["data"] = perf_counter()
 
 # Start program
 copyright_text = (f"SCP-079-{sender} v{version}, Copyright (C) 2019-2020 SCP-079 <https://scp-079.org>\n"
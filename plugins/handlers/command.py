@@ -25,6 +25,7 @@ from pyrogram import Client, Filters, Message
 
 from .. import glovar
 from ..functions.channel import get_debug_text, send_debug, share_data
+from ..functions.dispatch import dispatch
 from ..functions.etc import code, code_block, delay, general_link, get_command_context, get_command_type, get_int
 from ..functions.etc import get_now, get_readable_time, lang, mention_id, thread
 from ..functions.file import save
@@ -69,7 +70,7 @@ def channel(client: Client, message: Message) -> bool:
             if not r_message.forward_from_chat:
                 text += (f"{lang('status')}{lang('colon')}{code(lang('status_failed'))}\n"
                          f"{lang('reason')}{lang('colon')}{code(lang('command_usage'))}\n")
-                thread(send_report_message, (15, client, gid, text))
+                dispatch("tip", send_report_message, (15, client, gid, text))
                 return True
 
             # Try to send a message to the channel
@@ -88,14 +89,14 @@ def channel(client: Client, message: Message) -> bool:
             if not result:
                 text += (f"{lang('status')}{lang('colon')}{code(lang('status_failed'))}\n"
                          f"{lang('reason')}{lang('colon')}{code(lang('command_usage'))}\n")
-                thread(send_report_message, (15, client, gid, text))
+                dispatch("tip", send_report_message, (15, client, gid, text))
                 return True
             else:
                 text += (f"{lang('status')}{lang('colon')}{code(lang('status_succeeded'))}\n"
                          f"{lang('channel')}{lang('colon')}{code(cid)}\n")
 
             # Send the report message
-            thread(send_report_message, (20, client, gid, text))
+            dispatch("tip", send_report_message, (20, client, gid, text))
 
             # Send debug message
             send_debug(
@@ -120,7 +121,7 @@ def channel(client: Client, message: Message) -> bool:
         if command_type not in {"text", "button"} or not command_context:
             text += (f"{lang('status')}{lang('colon')}{code(lang('status_failed'))}\n"
                      f"{lang('reason')}{lang('colon')}{code(lang('command_usage'))}\n")
-            thread(send_report_message, (15, client, gid, text))
+            dispatch("tip", send_report_message, (15, client, gid, text))
             return True
 
         # Change the button config
@@ -145,7 +146,7 @@ def channel(client: Client, message: Message) -> bool:
         )
 
         # Send the report message
-        thread(send_report_message, (20, client, gid, text))
+        dispatch("tip", send_report_message, (20, client, gid, text))
 
         return True
     except Exception as e:
@@ -198,7 +199,7 @@ def close_channel(client: Client, message: Message) -> bool:
         if not result:
             text += (f"{lang('status')}{lang('colon')}{code(lang('status_failed'))}\n"
                      f"{lang('reason')}{lang('colon')}{code(lang('command_usage'))}\n")
-            thread(send_report_message, (15, client, gid, text))
+            dispatch("tip", send_report_message, (15, client, gid, text))
             return True
 
         # Send debug message
@@ -211,7 +212,7 @@ def close_channel(client: Client, message: Message) -> bool:
 
         # Send the report message
         text += f"{lang('status')}{lang('colon')}{code(lang('status_succeeded'))}\n"
-        thread(send_report_message, (20, client, gid, text))
+        dispatch("tip", send_report_message, (20, client, gid, text))
 
         return True
     except Exception as e:
@@ -293,7 +294,7 @@ def config(client: Client, message: Message) -> bool:
         text = get_debug_text(client, message.chat)
         text += (f"{lang('admin_group')}{lang('colon')}{code(message.from_user.id)}\n"
                  f"{lang('action')}{lang('colon')}{code(lang('config_create'))}\n")
-        thread(send_message, (client, glovar.debug_channel_id, text))
+        dispatch("debug", send_message, (client, glovar.debug_channel_id, text))
 
         return True
     except Exception as e:
@@ -339,7 +340,7 @@ def config_directly(client: Client, message: Message) -> bool:
             if command_type == "show":
                 text += f"{lang('action')}{lang('colon')}{code(lang('config_show'))}\n"
                 text += get_config_text(new_config)
-                thread(send_report_message, (30, client, gid, text))
+                dispatch("tip", send_report_message, (30, client, gid, text))
                 return True
 
             now = get_now()
@@ -391,11 +392,11 @@ def config_directly(client: Client, message: Message) -> bool:
             debug_text += (f"{lang('admin_group')}{lang('colon')}{code(message.from_user.id)}\n"
                            f"{lang('action')}{lang('colon')}{code(lang('config_change'))}\n"
                            f"{lang('more')}{lang('colon')}{code(f'{command_type} {command_context}')}\n")
-            thread(send_message, (client, glovar.debug_channel_id, debug_text))
+            dispatch("debug", send_message, (client, glovar.debug_channel_id, debug_text))
 
         text += (f"{lang('action')}{lang('colon')}{code(lang('config_change'))}\n"
                  f"{lang('status')}{lang('colon')}{code(reason)}\n")
-        thread(send_report_message, ((lambda x: 10 if x else 5)(success), client, gid, text))
+        dispatch("tip", send_report_message, ((lambda x: 10 if x else 5)(success), client, gid, text))
 
         return True
     except Exception as e:
@@ -436,7 +437,7 @@ def hold(client: Client, message: Message) -> bool:
         if not r_message:
             text += (f"{lang('status')}{lang('colon')}{code(lang('status_failed'))}\n"
                      f"{lang('reason')}{lang('colon')}{code(lang('command_usage'))}\n")
-            thread(send_report_message, (15, client, gid, text))
+            dispatch("tip", send_report_message, (15, client, gid, text))
             return True
 
         # Hold the message
@@ -449,7 +450,7 @@ def hold(client: Client, message: Message) -> bool:
                  f"{lang('pinned_message')}{lang('colon')}{code(r_message.message_id)}\n")
 
         # Send the report message
-        thread(send_report_message, (20, client, gid, text))
+        dispatch("tip", send_report_message, (20, client, gid, text))
 
         # Send debug message
         send_debug(
@@ -517,13 +518,13 @@ def keyword(client: Client, message: Message) -> bool:
                 text = code_block(result)
 
             # Send the report message
-            return thread(send_report_message, (20, client, gid, text))
+            return dispatch("tip", send_report_message, (20, client, gid, text))
 
         # Check command format
         if not command_type or command_type not in {"text", "button", "link"} or not command_context:
             text += (f"{lang('status')}{lang('colon')}{code(lang('status_failed'))}\n"
                      f"{lang('reason')}{lang('colon')}{code(lang('command_usage'))}\n")
-            thread(send_report_message, (15, client, gid, text))
+            dispatch("tip", send_report_message, (15, client, gid, text))
             return True
 
         # Config keyword
@@ -534,7 +535,7 @@ def keyword(client: Client, message: Message) -> bool:
             if not result:
                 text += (f"{lang('status')}{lang('colon')}{code(lang('status_failed'))}\n"
                          f"{lang('reason')}{lang('colon')}{code(lang('command_usage'))}\n")
-                thread(send_report_message, (15, client, gid, text))
+                dispatch("tip", send_report_message, (15, client, gid, text))
                 return True
             else:
                 glovar.configs[gid]["default"] = False
@@ -543,7 +544,7 @@ def keyword(client: Client, message: Message) -> bool:
                 text += f"{lang('status')}{lang('colon')}{code(lang('status_succeeded'))}\n"
 
             # Send the report message
-            thread(send_report_message, (20, client, gid, text))
+            dispatch("tip", send_report_message, (20, client, gid, text))
 
             # Send debug message
             send_debug(
@@ -570,7 +571,7 @@ def keyword(client: Client, message: Message) -> bool:
             )
 
             # Send the report message
-            thread(send_report_message, (20, client, gid, text))
+            dispatch("tip", send_report_message, (20, client, gid, text))
 
         return True
     except Exception as e:
@@ -619,7 +620,7 @@ def open_channel(client: Client, message: Message) -> bool:
         if not result:
             text += (f"{lang('status')}{lang('colon')}{code(lang('status_failed'))}\n"
                      f"{lang('reason')}{lang('colon')}{code(lang('command_usage'))}\n")
-            thread(send_report_message, (15, client, gid, text))
+            dispatch("tip", send_report_message, (15, client, gid, text))
             return True
 
         # Send debug message
@@ -632,7 +633,7 @@ def open_channel(client: Client, message: Message) -> bool:
 
         # Send the report message
         text += f"{lang('status')}{lang('colon')}{code(lang('status_succeeded'))}\n"
-        thread(send_report_message, (20, client, gid, text))
+        dispatch("tip", send_report_message, (20, client, gid, text))
 
         return True
     except Exception as e:
@@ -689,7 +690,7 @@ def ot(client: Client, message: Message) -> bool:
                 text = code_block(result)
 
             # Send the report message
-            return thread(send_report_message, (20, client, gid, text))
+            return dispatch("tip", send_report_message, (20, client, gid, text))
 
         # Text prefix
         text = (f"{lang('admin')}{lang('colon')}{code(aid)}\n"
@@ -699,7 +700,7 @@ def ot(client: Client, message: Message) -> bool:
         if not command_type or command_type not in {"text", "button", "link"} or not command_context:
             text += (f"{lang('status')}{lang('colon')}{code(lang('status_failed'))}\n"
                      f"{lang('reason')}{lang('colon')}{code(lang('command_usage'))}\n")
-            thread(send_report_message, (15, client, gid, text))
+            dispatch("tip", send_report_message, (15, client, gid, text))
             return True
 
         # Config OT
@@ -717,7 +718,7 @@ def ot(client: Client, message: Message) -> bool:
         )
 
         # Send the report message
-        thread(send_report_message, (20, client, gid, text))
+        dispatch("tip", send_report_message, (20, client, gid, text))
 
         return True
     except Exception as e:
@@ -766,7 +767,7 @@ def resend(client: Client, message: Message) -> bool:
         if not result:
             text += (f"{lang('status')}{lang('colon')}{code(lang('status_failed'))}\n"
                      f"{lang('reason')}{lang('colon')}{code(lang('command_usage'))}\n")
-            thread(send_report_message, (15, client, gid, text))
+            dispatch("tip", send_report_message, (15, client, gid, text))
             return True
 
         # Send debug message
@@ -779,7 +780,7 @@ def resend(client: Client, message: Message) -> bool:
 
         # Send the report message
         text += f"{lang('status')}{lang('colon')}{code(lang('status_succeeded'))}\n"
-        thread(send_report_message, (20, client, gid, text))
+        dispatch("tip", send_report_message, (20, client, gid, text))
 
         return True
     except Exception as e:
@@ -838,7 +839,7 @@ def rm(client: Client, message: Message) -> bool:
                 text = code_block(result)
 
             # Send the report message
-            return thread(send_report_message, (20, client, gid, text))
+            return dispatch("tip", send_report_message, (20, client, gid, text))
 
         # Text prefix
         text = (f"{lang('admin')}{lang('colon')}{code(aid)}\n"
@@ -848,7 +849,7 @@ def rm(client: Client, message: Message) -> bool:
         if not command_type or command_type not in {"text", "button", "link"} or not command_context:
             text += (f"{lang('status')}{lang('colon')}{code(lang('status_failed'))}\n"
                      f"{lang('reason')}{lang('colon')}{code(lang('command_usage'))}\n")
-            thread(send_report_message, (15, client, gid, text))
+            dispatch("tip", send_report_message, (15, client, gid, text))
             return True
 
         # Config RM
@@ -866,7 +867,7 @@ def rm(client: Client, message: Message) -> bool:
         )
 
         # Send the report message
-        thread(send_report_message, (20, client, gid, text))
+        dispatch("tip", send_report_message, (20, client, gid, text))
 
         return True
     except Exception as e:
@@ -913,7 +914,7 @@ def show(client: Client, message: Message) -> bool:
         if not command_type or command_type not in type_list:
             text += (f"{lang('status')}{lang('colon')}{code(lang('status_failed'))}\n"
                      f"{lang('reason')}{lang('colon')}{code(lang('command_usage'))}\n")
-            thread(send_report_message, (15, client, gid, text))
+            dispatch("tip", send_report_message, (15, client, gid, text))
             return True
 
         # Get the config
@@ -926,7 +927,7 @@ def show(client: Client, message: Message) -> bool:
             text = code_block(result)
 
         # Send the report message
-        thread(send_report_message, (20, client, gid, text))
+        dispatch("tip", send_report_message, (20, client, gid, text))
 
         return True
     except Exception as e:
@@ -989,13 +990,13 @@ def welcome(client: Client, message: Message) -> bool:
                 text = code_block(result)
 
             # Send the report message
-            return thread(send_report_message, (20, client, gid, text))
+            return dispatch("tip", send_report_message, (20, client, gid, text))
 
         # Check command format
         if not command_type or command_type not in {"text", "button", "link"} or not command_context:
             text += (f"{lang('status')}{lang('colon')}{code(lang('status_failed'))}\n"
                      f"{lang('reason')}{lang('colon')}{code(lang('command_usage'))}\n")
-            thread(send_report_message, (15, client, gid, text))
+            dispatch("tip", send_report_message, (15, client, gid, text))
             return True
 
         # Config welcome
@@ -1021,7 +1022,7 @@ def welcome(client: Client, message: Message) -> bool:
         )
 
         # Send the report message
-        thread(send_report_message, (20, client, gid, text))
+        dispatch("tip", send_report_message, (20, client, gid, text))
 
         return True
     except Exception as e:
@@ -21,23 +21,20 @@ import logging
 from pyrogram import Client, Filters, Message
 
 from .. import glovar
+from ..functions.analysis import analyze
 from ..functions.channel import get_debug_text
+from ..functions.dispatch import dispatch
 from ..functions.etc import code, delay, general_link, get_filename, get_forward_name, get_full_name, get_now, get_text
-from ..functions.etc import lang, mention_id, t2t, thread
+from ..functions.etc import lang, mention_id, thread
 from ..functions.file import save
 from ..functions.filters import aio, authorized_group, channel_pinned, class_d, declared_message, exchange_channel
-from ..functions.filters import from_user, hide_channel, is_ban_text, is_bio_text, is_class_d_user, is_declared_message
-from ..functions.filters import is_high_score_user, is_keyword_text, is_nm_text, is_regex_text, is_rm_text
-from ..functions.filters import is_watch_user, is_wb_text, new_group, test_group
-from ..functions.group import leave_group
+from ..functions.filters import from_user, hide_channel, is_class_d_user, is_declared_message, is_high_score_user
+from ..functions.filters import is_keyword_text, is_rm_text, is_watch_user, new_group, test_group
+from ..functions.group import leave_group, update_joins
 from ..functions.ids import init_group_id, init_user_id
-from ..functions.receive import receive_add_bad, receive_captcha_flood, receive_config_commit, receive_clear_data
-from ..functions.receive import receive_config_reply, receive_config_show, receive_declared_message
-from ..functions.receive import receive_help_welcome, receive_leave_approve, receive_regex, receive_refresh
-from ..functions.receive import receive_remove_bad, receive_remove_score, receive_remove_watch, receive_rollback
-from ..functions.receive import receive_text_data, receive_user_score, receive_watch_user
-from ..functions.telegram import get_admins, get_user_full, pin_chat_message, send_message
-from ..functions.timers import backup_files, send_count
+from ..functions.receive import receive_text_data
+from ..functions.route import route_data
+from ..functions.telegram import get_admins, get_user_bios, pin_chat_message, send_message
 from ..functions.tip import tip_keyword, tip_rm, tip_welcome
 
 # Enable logging
@@ -50,7 +47,6 @@ logger = logging.getLogger(__name__)
                    & ~channel_pinned & ~declared_message)
 def check(client: Client, message: Message) -> bool:
     # Check the messages sent from groups
-    glovar.locks["message"].acquire()
     try:
         # Basic data
         gid = message.chat.id
@@ -62,70 +58,47 @@ def check(client: Client, message: Message) -> bool:
                 or (not glovar.configs[gid].get("keyword_text") and not glovar.configs[gid].get("rm_text"))):
             return True
 
-        # Check the forward from name
-        forward_name = get_forward_name(message, True, True)
-
-        if forward_name and is_nm_text(forward_name):
-            return True
-
-        # Check the user's name
-        name = get_full_name(message.from_user, True, True)
-
-        if name and is_nm_text(name):
-            return True
-
-        # Check the text
-        message_text = get_text(message, True, True)
-
-        if is_ban_text(message_text, False):
-            return True
-
-        if is_regex_text("del", message_text):
-            return True
-
-        # File name
-        filename = get_filename(message, True, True)
-
-        if is_ban_text(filename, False):
-            return True
-
-        if is_regex_text("fil", filename):
-            return True
+        # Check the forward from name, the user's name, the text and the file name without holding the lock
+        texts = {
+            "forward_name": get_forward_name(message),
+            "name": get_full_name(message.from_user),
+            "text": get_text(message),
+            "filename": get_filename(message)
+        }
 
-        if is_regex_text("del", filename):
+        if analyze("message", texts):
             return True
 
-        # User status
-        if is_watch_user(message.from_user, "ban", now):
-            return True
+        with glovar.locks["message"]:
+            # User status
+            if is_watch_user(message.from_user, "ban", now):
+                return True
 
-        if is_watch_user(message.from_user, "delete", now):
-            return True
+            if is_watch_user(message.from_user, "delete", now):
+                return True
 
-        if is_high_score_user(message.from_user):
-            return True
+            if is_high_score_user(message.from_user):
+                return True
 
-        # Check declare status
-        if is_declared_message(None, message):
-            return True
+            # Check declare status
+            if is_declared_message(None, message):
+                return True
 
-        # Check keyword
-        rid, detection = is_keyword_text(message)
+            # Check keyword
+            rid, detection = is_keyword_text(message)
 
-        if detection:
-            return tip_keyword(client, message, detection, rid)
+            if detection:
+                return tip_keyword(client, message, detection, rid)
 
-        # Check rm
-        detection = is_rm_text(message)
+            # Check rm
+            detection = is_rm_text(message)
 
-        if detection:
-            return tip_rm(client, gid, detection, mid)
+            if detection:
+                return tip_rm(client, gid, detection, mid)
 
         return True
     except Exception as e:
         logger.warning(f"Check error: {e}", exc_info=True)
-    finally:
-        glovar.locks["message"].release()
 
     return False
 
@@ -136,10 +109,10 @@ def check(client: Client, message: Message) -> bool:
                    & ~declared_message)
 def check_join(client: Client, message: Message) -> bool:
     # Check new joined user
-    glovar.locks["message"].acquire()
     try:
         # Basic data
         gid = message.chat.id
+        now = message.date or get_now()
 
         # Check config
         if not glovar.configs[gid].get("welcome"):
@@ -153,47 +126,44 @@ def check_join(client: Client, message: Message) -> bool:
         if gid in glovar.flooded_ids:
             return False
 
-        for new in message.new_chat_members:
-            # Basic data
-            uid = new.id
+        # Check join burst
+        raid = update_joins(client, gid, len(message.new_chat_members), now)
 
+        for new in message.new_chat_members:
             # Check if the user is Class D personnel
             if is_class_d_user(new):
                 return True
 
             # Check name
-            name = get_full_name(new, True, True)
-
-            if name and (is_nm_text(name) or is_wb_text(name, False)):
+            if analyze("join", {"name": get_full_name(new)}):
                 return True
 
-            # Check bio
-            user = get_user_full(client, uid)
+        # Check bios, fetch them at the same time without holding the lock, skip them during a join burst
+        bios = {} if raid else get_user_bios(client, [new.id for new in message.new_chat_members])
 
-            if not user or not user.about:
-                bio = ""
-            else:
-                bio = t2t(user.about, True, True)
-
-            if bio and (is_bio_text(bio) or is_wb_text(bio, False)):
-                return True
+        if any(bio and analyze("join", {"bio": bio}) for bio in bios.values()):
+            return True
 
+        with glovar.locks["message"]:
             # Check declare status
             if is_declared_message(None, message):
                 return True
 
-            # Init the user's status
-            if not init_user_id(uid):
+            # Init the users' status
+            if not all(init_user_id(new.id) for new in message.new_chat_members):
                 return True
 
-        # Welcome
-        tip_welcome(client, message)
+            # Send at most one welcome in each window during a join burst,
+            # the users joined inside the window are welcomed together when it ends
+            passed = now - glovar.message_ids[gid]["welcome"][1]
+            secs = raid and passed < glovar.time_raid and glovar.time_raid - passed or 0
+
+            # Welcome
+            tip_welcome(client, message, secs=secs)
 
         return True
     except Exception as e:
         logger.warning(f"Check join error: {e}", exc_info=True)
-    finally:
-        glovar.locks["message"].release()
 
     return False
 
@@ -234,7 +204,7 @@ def exchange_emergency(client: Client, message: Message) -> bool:
         text = (f"{lang('project')}{lang('colon')}{project_text}\n"
                 f"{lang('action')}{lang('colon')}{code(lang('transfer_channel'))}\n"
                 f"{lang('emergency_channel')}{lang('colon')}{code(hide_text)}\n")
-        thread(send_message, (client, glovar.debug_channel_id, text))
+        dispatch("debug", send_message, (client, glovar.debug_channel_id, text))
 
         return True
     except Exception as e:
@@ -296,7 +266,7 @@ def init_group(client: Client, message: Message) -> bool:
             text += f"{lang('inviter')}{lang('colon')}{code(inviter.id)}\n"
 
         # Send debug message
-        thread(send_message, (client, glovar.debug_channel_id, text))
+        dispatch("debug", send_message, (client, glovar.debug_channel_id, text))
 
         return True
     except Exception as e:
@@ -346,7 +316,6 @@ def pin(client: Client, message: Message) -> bool:
                    & exchange_channel)
 def process_data(client: Client, message: Message) -> bool:
     # Process the data in exchange channel
-    glovar.locks["receive"].acquire()
     try:
         data = receive_text_data(message)
 
@@ -359,194 +328,14 @@ def process_data(client: Client, message: Message) -> bool:
         action_type = data["type"]
         data = data["data"]
 
-        # This will look awkward,
-        # seems like it can be simplified,
-        # but this is to ensure that the permissions are clear,
-        # so it is intentionally written like this
-        if glovar.sender in receivers:
-
-            if sender == "CAPTCHA":
-
-                if action == "captcha":
-                    if action_type == "flood":
-                        receive_captcha_flood(data)
-
-                elif action == "help":
-                    if action_type == "welcome":
-                        receive_help_welcome(client, data)
-
-                elif action == "update":
-                    if action_type == "declare":
-                        receive_declared_message(data)
-                    elif action_type == "score":
-                        receive_user_score(sender, data)
-
-            elif sender == "CLEAN":
-
-                if action == "add":
-                    if action_type == "bad":
-                        receive_add_bad(data)
-                    elif action_type == "watch":
-                        receive_watch_user(data)
-
-                elif action == "update":
-                    if action_type == "declare":
-                        receive_declared_message(data)
-                    elif action_type == "score":
-                        receive_user_score(sender, data)
-
-            elif sender == "CONFIG":
-
-                if action == "config":
-                    if action_type == "commit":
-                        receive_config_commit(data)
-                    elif action_type == "reply":
-                        receive_config_reply(client, data)
-
-            elif sender == "LANG":
-
-                if action == "add":
-                    if action_type == "bad":
-                        receive_add_bad(data)
-                    elif action_type == "watch":
-                        receive_watch_user(data)
-
-                elif action == "update":
-                    if action_type == "declare":
-                        receive_declared_message(data)
-                    elif action_type == "score":
-                        receive_user_score(sender, data)
-
-            elif sender == "LONG":
-
-                if action == "add":
-                    if action_type == "bad":
-                        receive_add_bad(data)
-                    elif action_type == "watch":
-                        receive_watch_user(data)
-
-                elif action == "update":
-                    if action_type == "declare":
-                        receive_declared_message(data)
-                    elif action_type == "score":
-                        receive_user_score(sender, data)
-
-            elif sender == "MANAGE":
-
-                if action == "add":
-                    if action_type == "bad":
-                        receive_add_bad(data)
-
-                elif action == "backup":
-                    if action_type == "now":
-                        thread(backup_files, (client,))
-                    elif action_type == "rollback":
-                        receive_rollback(client, message, data)
-
-                elif action == "clear":
-                    receive_clear_data(client, action_type, data)
-
-                elif action == "config":
-                    if action_type == "show":
-                        receive_config_show(client, data)
-
-                elif action == "leave":
-                    if action_type == "approve":
-                        receive_leave_approve(client, data)
-
-                elif action == "remove":
-                    if action_type == "bad":
-                        receive_remove_bad(data)
-                    elif action_type == "score":
-                        receive_remove_score(data)
-                    elif action_type == "watch":
-                        receive_remove_watch(data)
-
-                elif action == "update":
-                    if action_type == "refresh":
-                        receive_refresh(client, data)
-
-            elif sender == "NOFLOOD":
-
-                if action == "add":
-                    if action_type == "bad":
-                        receive_add_bad(data)
-                    elif action_type == "watch":
-                        receive_watch_user(data)
-
-                elif action == "update":
-                    if action_type == "declare":
-                        receive_declared_message(data)
-                    elif action_type == "score":
-                        receive_user_score(sender, data)
-
-            elif sender == "NOPORN":
-
-                if action == "add":
-                    if action_type == "bad":
-                        receive_add_bad(data)
-                    elif action_type == "watch":
-                        receive_watch_user(data)
-
-                elif action == "update":
-                    if action_type == "declare":
-                        receive_declared_message(data)
-                    elif action_type == "score":
-                        receive_user_score(sender, data)
-
-            elif sender == "NOSPAM":
-
-                if action == "add":
-                    if action_type == "bad":
-                        receive_add_bad(data)
-                    elif action_type == "watch":
-                        receive_watch_user(data)
-
-                elif action == "update":
-                    if action_type == "declare":
-                        receive_declared_message(data)
-                    elif action_type == "score":
-                        receive_user_score(sender, data)
-
-            elif sender == "RECHECK":
-
-                if action == "add":
-                    if action_type == "bad":
-                        receive_add_bad(data)
-                    elif action_type == "watch":
-                        receive_watch_user(data)
-
-                elif action == "update":
-                    if action_type == "declare":
-                        receive_declared_message(data)
-                    elif action_type == "score":
-                        receive_user_score(sender, data)
-
-            elif sender == "REGEX":
-
-                if action == "regex":
-                    if action_type == "update":
-                        receive_regex(client, message, data)
-                    elif action_type == "count":
-                        if data == "ask":
-                            send_count(client)
-
-            elif sender == "WARN":
-
-                if action == "update":
-                    if action_type == "score":
-                        receive_user_score(sender, data)
-
-            elif sender == "WATCH":
-
-                if action == "add":
-                    if action_type == "watch":
-                        receive_watch_user(data)
+        if glovar.sender not in receivers:
+            return True
+
+        # The permissions are listed in the routing table
+        route_data(client, message, sender, action, action_type, data)
 
         return True
     except Exception as e:
         logger.warning(f"Process data error: {e}", exc_info=True)
-    finally:
-        glovar.locks["receive"].release()
 
     return False
@@ -0,0 +1,120 @@
+# SCP-079-TIP - Here's a tip
+# Copyright (C) 2019-2020 SCP-079 <https://scp-079.org>
+#
+# This file is part of SCP-079-TIP.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published
+# by the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+from hashlib import sha256
+from json import dumps, loads
+from mmap import ACCESS_READ, mmap
+from os import fsync, replace
+from os.path import exists
+from shutil import copyfile
+from typing import Dict, Optional, Union
+from zlib import compress, decompress
+
+# Enable logging
+logger = logging.getLogger(__name__)
+
+# Snapshot format
+# MAGIC, VERSION (1 byte), sha256 of the rest (32 bytes), index length (4 bytes), index (JSON), sections
+MAGIC = b"SCP-079-TIP"
+VERSION = 1
+HEADER = len(MAGIC) + 1 + 32
+
+
+def compress_data(data: bytes, enabled: bool = True) -> bytes:
+    # Compress the pickled data if enabled
+    if not enabled or not data:
+        return data
+
+    return compress(data, 6)
+
+
+def decompress_data(data: Union[bytes, memoryview]) -> Union[bytes, memoryview]:
+    # Decompress the data if it is compressed, a pickle never starts with the zlib header byte
+    if data[:1] != b"\x78":
+        return data
+
+    return decompress(data)
+
+
+def dump_snapshot(path: str, sections: Dict[str, bytes], backup: str = "") -> bool:
+    # Write the pickled sections to the snapshot, replace the old one atomically
+    result = False
+
+    try:
+        index = {}
+        offset = 0
+
+        for name, data in sections.items():
+            index[name] = [offset, len(data)]
+            offset += len(data)
+
+        index = dumps(index).encode()
+        rest = [len(index).to_bytes(4, "big"), index] + list(sections.values())
+
+        digest = sha256()
+
+        for data in rest:
+            digest.update(data)
+
+        with open(f"{path}.tmp", "wb") as f:
+            f.write(MAGIC + bytes([VERSION]) + digest.digest())
+
+            for data in rest:
+                f.write(data)
+
+            f.flush()
+            fsync(f.fileno())
+
+        # Keep the last good snapshot as the backup
+        backup and exists(path) and copyfile(path, backup)
+        replace(f"{path}.tmp", path)
+
+        result = True
+    except Exception as e:
+        logger.warning(f"Dump snapshot error: {e}", exc_info=True)
+
+    return result
+
+
+def load_snapshot(path: str, mapped: bool = False) -> Optional[Dict[str, Union[bytes, memoryview]]]:
+    # Read the pickled sections of the snapshot, return None if it is broken
+    result = None
+
+    try:
+        with open(path, "rb") as f:
+            if mapped:
+                data = memoryview(mmap(f.fileno(), 0, access=ACCESS_READ))
+            else:
+                data = memoryview(f.read())
+
+        if bytes(data[:len(MAGIC)]) != MAGIC or data[len(MAGIC)] != VERSION:
+            raise ValueError("unknown snapshot format")
+
+        if sha256(data[HEADER:]).digest() != bytes(data[HEADER - 32:HEADER]):
+            raise ValueError("checksum mismatch")
+
+        length = int.from_bytes(data[HEADER:HEADER + 4], "big")
+        index = loads(bytes(data[HEADER + 4:HEADER + 4 + length]))
+        body = HEADER + 4 + length
+
+        result = {name: data[body + offset:body + offset + size] for name, (offset, size) in index.items()}
+    except Exception as e:
+        logger.critical(f"Load snapshot {path} error: {e}", exc_info=True)
+
+    return result
@@ -17,19 +17,37 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import logging
+from functools import wraps
+from threading import Lock
+from time import perf_counter
+from typing import Callable
+
+from pyrogram import Client
 
 from . import glovar
-from .functions.file import delete_file, save
+from .functions.decorators import threaded
+from .functions.etc import get_converter
+from .functions.file import delete_file, migrate_snapshot, save
+from .functions.ids import set_watch_ids
 
 # Enable logging
 logger = logging.getLogger(__name__)
 
+# Init the startup report
+report_lock = Lock()
+
 
 def init() -> bool:
     # Init the data
     result = False
 
     try:
+        # Write the data files again after the snapshot mode was disabled
+        glovar.snapshot_migrate and migrate_snapshot()
+
+        # Index the loaded watch users
+        set_watch_ids(glovar.watch_ids)
+
         # Check version
         if glovar.current == glovar.version:
             return True
@@ -46,6 +64,57 @@ def init() -> bool:
     return result
 
 
+@threaded()
+def preload() -> bool:
+    # Load the rule tables and init the converter in the background before the messages need them
+    result = False
+
+    try:
+        for name in glovar.lazy_list:
+            getattr(glovar, name)
+
+        get_converter()
+        glovar.startup["rules"] = perf_counter()
+        report_startup()
+
+        result = True
+    except Exception as e:
+        logger.warning(f"Preload error: {e}", exc_info=True)
+
+    return result
+
+
+def profile(client: Client) -> bool:
+    # Mark the started client, and the first update handled by it
+    result = False
+
+    try:
+        glovar.startup["client"] = perf_counter()
+
+        for group in client.dispatcher.groups.values():
+            for handler in group:
+                handler.callback = profiled(handler.callback)
+
+        result = True
+    except Exception as e:
+        logger.warning(f"Profile error: {e}", exc_info=True)
+
+    return result
+
+
+def profiled(func: Callable) -> Callable:
+    # Mark the first time the handler returns
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            if "message" not in glovar.startup:
+                glovar.startup.setdefault("message", perf_counter())
+                report_startup()
+    return wrapper
+
+
 def renew() -> bool:
     # Renew the session
     result = False
@@ -68,3 +137,34 @@ def renew() -> bool:
         logger.warning(f"Renew error: {e}", exc_info=True)
 
     return result
+
+
+def report_startup() -> bool:
+    # Log the time spent by each startup phase, once the first update was handled
+    result = False
+
+    try:
+        with report_lock:
+            if "report" in glovar.startup or "message" not in glovar.startup or "rules" not in glovar.startup:
+                return False
+
+            glovar.startup["report"] = perf_counter()
+
+        begin = last = glovar.startup["import"]
+        phases = []
+
+        for phase, mark in sorted(glovar.startup.items(), key=lambda x: x[1]):
+            if phase in {"import", "report"}:
+                continue
+
+            phases.append(f"{phase} {mark - last:.3f}s")
+            last = mark
+
+        logger.warning(f"Startup profile: {', '.join(phases)}, "
+                       f"first update handled {glovar.startup['message'] - begin:.3f}s after start")
+
+        result = True
+    except Exception as e:
+        logger.warning(f"Report startup error: {e}", exc_info=True)
+
+    return result